@@ -0,0 +1,190 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # 仅异步客户端需要
+    aiohttp = None
+
+# 默认参数：初始/最小/最大并发数、乘性减小系数以及重试退避的基准和上限（秒）
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 32
+DEFAULT_DECREASE_FACTOR = 0.5
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 60.0
+
+
+def is_overload_error(error):
+    """
+    判断异常是否说明前端过载：超时、连接失败、HTTP 5xx 或 429（同时识别 requests 和 aiohttp 的异常）
+    """
+    if isinstance(error, (requests.Timeout, requests.ConnectionError, TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    if aiohttp is not None:
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status >= 500 or error.status == 429
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return True
+    return False
+
+
+def full_jitter_delay(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD 并发控制器：每个成功请求把并发上限提高 1/上限（约每轮 +1），
+    超时、连接失败、HTTP 5xx 或 429（见 is_overload_error）时把上限乘以 decrease_factor。同一轮已发出的请求只触发一次减小。
+    延迟只做统计、不视为过载：批量 history.get 正常就需要较长时间，按固定延迟阈值减小会把上限压在最小值附近。
+    失败请求按指数退避加随机抖动（full jitter）重试。线程安全，可在多个报表脚本间共享。
+    """
+
+    def __init__(self, initial_limit=DEFAULT_INITIAL_LIMIT, min_limit=DEFAULT_MIN_LIMIT, max_limit=DEFAULT_MAX_LIMIT,
+                 decrease_factor=DEFAULT_DECREASE_FACTOR,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY, sample_size=1000):
+        """
+        :param initial_limit: 初始并发上限
+        :param min_limit: 并发上限的下限
+        :param max_limit: 并发上限的上限
+        :param decrease_factor: 过载时并发上限的乘性减小系数
+        :param base_delay: 重试退避的基准时间（秒）
+        :param max_delay: 重试退避的最长时间（秒）
+        :param sample_size: 用于计算延迟分位数的最近样本数
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._requests = 0
+        self._overloads = 0
+        self._latencies = deque(maxlen=sample_size)
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """当前并发上限"""
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self):
+        """当前在途请求数"""
+        return self._in_flight
+
+    def acquire(self):
+        """
+        等待并占用一个并发名额
+        :return: 请求开始时间（传给 release）
+        """
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+            return time.monotonic()
+
+    def release(self, started, overloaded=False):
+        """
+        释放并发名额并根据本次请求的结果调整上限
+        :param started: acquire 返回的开始时间
+        :param overloaded: 本次请求是否因过载失败
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._cond:
+            self._in_flight -= 1
+            self._requests += 1
+            if overloaded:
+                self._overloads += 1
+                # 上次减小之前发出的请求反映的是旧的并发水平，不重复减小
+                if started >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+                    self._last_decrease = now
+                    logging.info(f"前端过载，并发上限降至 {self.limit}")
+            else:
+                self._latencies.append(latency)
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._cond.notify_all()
+
+    def backoff_delay(self, attempt):
+        """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+        return full_jitter_delay(attempt, self.base_delay, self.max_delay)
+
+    def call(self, func, *args, max_retries=3, **kwargs):
+        """
+        在并发控制下调用 func，失败时按指数退避重试
+        :param func: 要调用的函数（如 zapi.history.get）
+        :param max_retries: 最大尝试次数
+        :return: func 的返回值
+        """
+        for attempt in range(max_retries):
+            started = self.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                self.release(started, overloaded=is_overload_error(e))
+                if attempt == max_retries - 1:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logging.warning(f"查询重试中 ({attempt+1}/{max_retries})，{delay:.1f} 秒后重试: {e}")
+                time.sleep(delay)
+            else:
+                self.release(started)
+                return result
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """
+        最近请求延迟的分位数（秒）
+        :return: {分位: 延迟}，没有样本时为空字典
+        """
+        with self._cond:
+            samples = sorted(self._latencies)
+        if not samples:
+            return {}
+        return {p: samples[min(len(samples) - 1, max(0, int(round(p / 100 * len(samples))) - 1))] for p in percentiles}
+
+    def stats(self):
+        """
+        当前状态：并发上限、在途请求数、请求总数、过载次数和延迟分位数
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "requests": self._requests,
+            "overloads": self._overloads,
+            "latency": self.latency_percentiles(),
+        }
+
+    def summary(self):
+        """状态摘要文本，用于报表结束时输出"""
+        stats = self.stats()
+        latency = "，".join(f"P{p} {value:.2f}秒" for p, value in stats["latency"].items()) or "无"
+        return (f"并发上限 {stats['limit']}，请求 {stats['requests']} 次，"
+                f"过载 {stats['overloads']} 次，延迟 {latency}")
+
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+
+def get_shared_limiter():
+    """
+    获取进程内共享的并发控制器，所有报表脚本的 API 请求共用同一个并发上限
+    """
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveConcurrencyLimiter()
+        return _shared_limiter
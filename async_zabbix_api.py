@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import aiohttp
+import pyzabbix
+from packaging.version import Version
+from typing import Any, Dict, List, Optional
+from login_zabbix_api import _read_login_config
+from adaptive_concurrency import is_overload_error, full_jitter_delay
+from history_windows import (HISTORY_FLOAT, DEFAULT_MAX_ITEMS_PER_REQUEST, DEFAULT_CHUNK_SECONDS,
+                             DEFAULT_MAX_ROWS_PER_REQUEST, plan_windows, split_window)
+
+# 默认最大并发请求数
+DEFAULT_MAX_CONCURRENCY = 100
+
+# 不需要携带认证令牌的方法
+_ANONYMOUS_METHODS = {"apiinfo.version", "user.checkAuthentication", "user.login"}
+
+_ZABBIX_5_4_0 = Version("5.4.0")
+_ZABBIX_6_4_0 = Version("6.4.0")
+
+
+class _AsyncAPIMethod:
+    def __init__(self, method: str, parent: "AsyncZabbixAPI"):
+        self._method = method
+        self._parent = parent
+
+    async def __call__(self, *args, **kwargs):
+        if args and kwargs:
+            raise TypeError("Found both args and kwargs")
+        response = await self._parent.do_request(self._method, args or kwargs)
+        return response["result"]
+
+
+class _AsyncAPIObject:
+    def __init__(self, name: str, parent: "AsyncZabbixAPI"):
+        self._name = name
+        self._parent = parent
+
+    def __getattr__(self, attr: str) -> _AsyncAPIMethod:
+        return _AsyncAPIMethod(f"{self._name}.{attr}", self._parent)
+
+    def __getitem__(self, attr: str) -> _AsyncAPIMethod:
+        return _AsyncAPIMethod(f"{self._name}.{attr}", self._parent)
+
+
+class AsyncZabbixAPI:
+    """
+    基于 asyncio + aiohttp 的Zabbix JSON-RPC客户端。
+
+    用法与 pyzabbix.ZabbixAPI 一致（如 await api.host.get(...)），错误同样抛出 pyzabbix.ZabbixAPIException。
+    所有请求共享一个HTTP连接池，由信号量限制同时在途的请求数，
+    可以用一个线程同时发出成百上千个请求。
+    """
+
+    def __init__(self, server_url: str, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: Optional[float] = 30):
+        """
+        :param server_url: Zabbix服务器URL
+        :param max_concurrency: 最大并发请求数
+        :param timeout: 单次请求超时时间（秒）
+        """
+        if not server_url.endswith("/api_jsonrpc.php"):
+            server_url = server_url.rstrip("/") + "/api_jsonrpc.php"
+        self.url = server_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.auth = ""
+        self.version: Optional[Version] = None
+        self.id = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # 会话必须在事件循环中创建，因此延迟到第一次请求
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={
+                    "Content-Type": "application/json-rpc",
+                    "User-Agent": "python/async_zabbix_api",
+                    "Cache-Control": "no-cache",
+                }
+            )
+        return self._session
+
+    async def login(self, username: str, password: str) -> None:
+        """
+        检测API版本并登录，保存认证令牌。
+        """
+        self.version = Version(await self.apiinfo.version())
+        self.auth = ""
+        if self.version >= _ZABBIX_5_4_0:
+            self.auth = await self.user.login(username=username, password=password)
+        else:
+            self.auth = await self.user.login(user=username, password=password)
+
+    async def do_request(self, method: str, params: Any = None) -> Dict[str, Any]:
+        self.id += 1
+        payload = {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": params or {},
+            "id": self.id,
+        }
+        headers = {}
+        if self.auth and method not in _ANONYMOUS_METHODS:
+            if self.version and self.version >= _ZABBIX_6_4_0:
+                headers["Authorization"] = f"Bearer {self.auth}"
+            else:
+                payload["auth"] = self.auth
+
+        async with self._semaphore:
+            async with self._get_session().post(self.url, json=payload, headers=headers) as resp:
+                resp.raise_for_status()
+                text = await resp.text()
+
+        if not text:
+            raise pyzabbix.ZabbixAPIException("Received empty response")
+        try:
+            response = json.loads(text)
+        except ValueError as e:
+            raise pyzabbix.ZabbixAPIException(f"Unable to parse json: {text[:200]}") from e
+
+        if "error" in response:
+            error = response["error"]
+            error.setdefault("data", "No data")
+            raise pyzabbix.ZabbixAPIException(
+                f"Error {error['code']}: {error['message']}, {error['data']}",
+                error["code"],
+                error=error,
+            )
+        return response
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def __aenter__(self) -> "AsyncZabbixAPI":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def __getattr__(self, attr: str) -> _AsyncAPIObject:
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return _AsyncAPIObject(attr, self)
+
+    def __getitem__(self, attr: str) -> _AsyncAPIObject:
+        return _AsyncAPIObject(attr, self)
+
+
+async def login_zabbix_async(config_file: str = "config.ini", config_section: str = "Zabbix",
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                             timeout: Optional[float] = 30) -> Optional[AsyncZabbixAPI]:
+    """
+    从配置文件读取登录参数并创建异步Zabbix API客户端。
+    :param config_file: 配置文件路径，默认为'config.ini'
+    :param config_section: 配置文件中Zabbix登录信息所在的节名，默认为'Zabbix'
+    :param max_concurrency: 最大并发请求数，默认为100
+    :param timeout: 单次请求超时时间（秒），默认为30
+    :return: 如果登录成功，返回AsyncZabbixAPI实例；否则返回None
+    """
+    login_config = _read_login_config(config_file, config_section)
+    if login_config is None:
+        return None
+    server_url, username, password = login_config
+    api = AsyncZabbixAPI(server_url, max_concurrency=max_concurrency, timeout=timeout)
+    try:
+        await api.login(username, password)
+        logging.info(f"成功登录Zabbix API！最大并发数: {max_concurrency}")
+        return api
+    except (pyzabbix.ZabbixAPIException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logging.error(f"Failed to login to Zabbix API: {e}")
+        await api.close()
+        return None
+
+
+async def _fetch_window_async(api: AsyncZabbixAPI, itemids: List[str], history: int, start: int, stop: int,
+                              max_rows: int, max_retries: int, result: Dict[str, list]) -> int:
+    """
+    异步拉取 [start, stop) 时间段内一组监控项的历史数据，结果被截断时的拆分规则与 history_fetch 相同。
+    超时、连接失败、HTTP 5xx/429 等过载错误按指数退避加随机抖动重试，其他错误（如参数错误）直接抛出。
+    """
+    for attempt in range(max_retries):
+        try:
+            rows = await api.history.get(itemids=itemids, history=history, time_from=start, time_till=stop - 1,
+                                         output=["itemid", "clock", "value"], sortfield="clock",
+                                         sortorder="ASC", limit=max_rows)
+            break
+        except Exception as e:
+            if attempt == max_retries - 1 or not is_overload_error(e):
+                raise
+            delay = full_jitter_delay(attempt)
+            logging.warning(f"查询重试中 ({attempt+1}/{max_retries})，{delay:.1f} 秒后重试: {e}")
+            await asyncio.sleep(delay)
+
+    halves = split_window(itemids, start, stop) if len(rows) >= max_rows else None
+    if halves:
+        counts = await asyncio.gather(*[
+            _fetch_window_async(api, ids, history, lo, hi, max_rows, max_retries, result) for ids, lo, hi in halves
+        ])
+        return sum(counts)
+
+    if len(rows) >= max_rows:
+        logging.warning(f"监控项 {itemids[0]} 在 {start} 秒内的数据超过 {max_rows} 行，结果可能不完整")
+    for row in rows:
+        result[row["itemid"]].append(row)
+    return 1
+
+
+async def fetch_history_async(api: AsyncZabbixAPI, itemids: List[str], time_from: int, time_till: int,
+                              history: int = HISTORY_FLOAT,
+                              max_items_per_request: int = DEFAULT_MAX_ITEMS_PER_REQUEST,
+                              chunk_seconds: int = DEFAULT_CHUNK_SECONDS,
+                              max_rows: int = DEFAULT_MAX_ROWS_PER_REQUEST,
+                              max_retries: int = 3) -> Dict[str, list]:
+    """
+    异步批量拉取历史数据：切分方式与 history_fetch.fetch_history 相同，但所有分片同时发出，
+    实际并发由客户端的信号量限制。
+    :return: {itemid: [按 clock 升序排列的历史记录]}
+    """
+    itemids = list(dict.fromkeys(str(itemid) for itemid in itemids))
+    result = {itemid: [] for itemid in itemids}
+    windows = plan_windows(itemids, time_from, time_till, max_items_per_request, chunk_seconds)
+
+    counts = await asyncio.gather(*[
+        _fetch_window_async(api, item_chunk, history, start, stop, max_rows, max_retries, result)
+        for item_chunk, start, stop in windows
+    ])
+    # 各分片完成顺序不确定，按时间重新排序
+    for rows in result.values():
+        rows.sort(key=lambda row: int(row["clock"]))
+    if counts:
+        logging.info(f"history.get 共请求 {sum(counts)} 次，监控项 {len(result)} 个，记录 {sum(len(r) for r in result.values())} 条")
+    return result
+
+
+if __name__ == "__main__":
+    async def main():
+        api = await login_zabbix_async()
+        if api is None:
+            return
+        async with api:
+            hosts = await api.host.get(output=["hostid", "host"])
+            logging.info(f"Zabbix API 版本: {api.version}，主机数量: {len(hosts)}")
+
+    asyncio.run(main())
@@ -6,10 +6,7 @@ Zabbix 主机自动创建脚本（优化版）
 
 import json
 import pandas as pd
-import requests
-from login_zabbix_api import login_zabbix_api
-from get_hostgroup_info import get_hostgroup_info
-from get_templateid import get_template_info
+from login_zabbix_api import get_shared_zabbix_api
 from get_proxy_info import get_proxy_info
 
 # 接口类型常量
@@ -23,13 +20,16 @@ CONFIG = {
         "proxy_name": "Proxy代理主机",
         "brand": "品牌",
         "model": "型号",
-        "system_type": "系统类型"
+        "system_type": "系统类型",
+        "group_name": "主机组",  # 可选列，为空时使用 create_hosts 的 group_name
+        "template_name": "模板"  # 可选列，为空时按监控类型使用默认模板
     },
     "interface_ports": {  
         "agent": "10050",
         "snmp": "161"
     },
     "snmp_community": "{$SNMP_COMMUNITY}",  
+    "request_timeout": 10,  # 单次请求超时（秒），批量提交时按主机数适当延长
 }
 
 def read_host_info_from_excel(file_path):
@@ -47,6 +47,16 @@ def read_host_info_from_excel(file_path):
     except Exception as e:
         raise RuntimeError(f"读取Excel失败: {e}")
 
+def get_cell_text(row, column_key):
+    """
+    读取可选单元格并去除首尾空白；空单元格（None、NaN 或空字符串）返回 None。
+    pandas 3 中 df.where(pd.notnull(df), None) 会保留 NaN，NaN 为真值，不能直接用 or 取默认值。
+    """
+    value = row.get(CONFIG["excel_columns"][column_key])
+    if value is None or pd.isna(value):
+        return None
+    return str(value).strip() or None
+
 def build_host_interface(host_type, host_ip):
     """构建监控接口配置"""
     interface = {
@@ -65,8 +75,8 @@ def build_host_interface(host_type, host_ip):
         }
     return interface
 
-def create_host_params(row, host_type, template_id, group_id, zapi_auth):
-    """构造主机创建请求参数（修复参数错误）"""
+def create_host_params(row, host_type, template_id, group_id, zapi_auth, zapi=None, proxy_ids=None):
+    """构造主机创建请求参数（修复参数错误）；传入 proxy_ids 时从预解析的映射表取代理ID"""
     try:
         host_ip = row[CONFIG["excel_columns"]["host_ip"]]
         if not host_ip:
@@ -74,19 +84,23 @@ def create_host_params(row, host_type, template_id, group_id, zapi_auth):
     except KeyError:
         raise ValueError("Excel数据格式错误，缺少IP地址列")
     
-    proxy_name = row.get(CONFIG["excel_columns"]["proxy_name"], None)
+    proxy_name = get_cell_text(row, "proxy_name")
     
     # 生成主机可见名称
-    brand = row.get(CONFIG["excel_columns"]["brand"], "Unknown") or "Unknown"
-    model = row.get(CONFIG["excel_columns"]["model"], "") or ""
+    brand = get_cell_text(row, "brand") or "Unknown"
+    model = get_cell_text(row, "model") or ""
     visible_name = f"{host_ip}_{brand}_{model}" if model else f"{host_ip}_{brand}"
     
     # 获取代理ID（修复参数错误）
     proxy_id = None
-    if proxy_name:
+    if proxy_name and proxy_ids is not None:
+        proxy_id = proxy_ids.get(proxy_name)
+        if proxy_id is None:
+            raise ValueError(f"获取代理ID失败: 代理{proxy_name}不存在")
+    elif proxy_name:
         try:
-            # 修复：移除多余的zapi参数
-            proxy_info = json.loads(get_proxy_info(proxy_name))
+            # 复用调用方的会话，避免每行重新登录
+            proxy_info = json.loads(get_proxy_info(proxy_name, zapi))
             if 'proxy_id' not in proxy_info:
                 raise ValueError(f"代理{proxy_name}不存在")
             proxy_id = proxy_info["proxy_id"]
@@ -113,24 +127,144 @@ def create_host_params(row, host_type, template_id, group_id, zapi_auth):
     
     return params
 
-def create_hosts(file_path, group_name, snmp_template, agent_template):
-    """批量创建主入口函数（增强异常处理）"""
-    # 初始化API连接
+def post_host_create(zapi, hosts):
+    """
+    以数组形式提交 host.create（同一请求内的主机要么全部成功，要么全部失败）
+    :param zapi: Zabbix API 会话
+    :param hosts: host.create 的主机参数列表
+    :return: JSON-RPC 响应
+    """
+    payload = {
+        "jsonrpc": "2.0",
+        "method": "host.create",
+        "params": hosts,
+        "auth": zapi.auth,
+        "id": 1
+    }
+    # 复用 ZabbixAPI 的 Session，保持 keep-alive 连接
+    return zapi.session.post(
+        zapi.url,
+        headers={"Content-Type": "application/json-rpc"},
+        json=payload,
+        timeout=CONFIG["request_timeout"] + len(hosts) // 10
+    ).json()
+
+def get_existing_hosts(zapi, host_names):
+    """
+    一次查询表格中已存在于服务器的主机（提交前记录，用于区分核对时查到的主机是否为本次创建）
+    :param zapi: Zabbix API 会话
+    :param host_names: 主机名称集合
+    :return: 已存在的主机名称集合
+    """
+    if not host_names:
+        return set()
+    hosts = zapi.host.get(filter={"host": sorted(host_names)}, output=["host"])
+    return {host["host"] for host in hosts}
+
+def reconcile_host_batch(zapi, batch, error, existing_before=frozenset()):
+    """
+    请求超时或连接失败后核对一批主机：服务端可能已经提交了该批次，
+    用一次 host.get 查询，提交前不存在而现在存在的主机记为成功，其余记为失败（不重新提交）
+    :param zapi: Zabbix API 会话
+    :param batch: [(行号, 主机IP, 主机参数)] 列表
+    :param error: 传输异常
+    :param existing_before: 提交前已存在的主机名称集合
+    :return: 与 batch 顺序一致的结果列表
+    """
     try:
-        zapi = login_zabbix_api()
+        hosts = zapi.host.get(filter={"host": [host_ip for _, host_ip, _ in batch]}, output=["hostid", "host"])
+        existing = {host["host"]: host["hostid"] for host in hosts}
     except Exception as e:
-        return [{"status": "error", "message": f"API登录失败: {e}"}]
-    
-    # 验证依赖项
+        existing = {}
+        error = f"{error}；核对主机失败: {e}"
+
+    results = []
+    for index, host_ip, _ in batch:
+        if host_ip in existing_before:
+            results.append({"status": "error", "host": host_ip, "message": f"第{index+2}行处理失败: 主机已存在"})
+        elif host_ip in existing:
+            results.append({"status": "success", "host": host_ip, "hostid": existing[host_ip],
+                            "message": "请求异常，核对后确认主机已创建"})
+        else:
+            results.append({"status": "error", "host": host_ip, "message": f"第{index+2}行处理失败: {error}"})
+    return results
+
+def submit_host_batch(zapi, batch, existing_before=frozenset()):
+    """
+    提交一批主机；JSON-RPC 返回错误时二分重试，定位出错的行。
+    超时或连接失败时服务端可能已经创建了主机，不重新提交，而是查询核对（见 reconcile_host_batch）
+    :param zapi: Zabbix API 会话
+    :param batch: [(行号, 主机IP, 主机参数)] 列表
+    :param existing_before: 提交前已存在的主机名称集合
+    :return: 与 batch 顺序一致的结果列表
+    """
     try:
-        group_info = json.loads(get_hostgroup_info(group_name))
-        group_id = group_info["group_id"]
-        snmp_info = json.loads(get_template_info(snmp_template))
-        snmp_tid = snmp_info["template_id"]
-        agent_info = json.loads(get_template_info(agent_template))
-        agent_tid = agent_info["template_id"]
+        resp = post_host_create(zapi, [host_params for _, _, host_params in batch])
     except Exception as e:
-        return [{"status": "error", "message": f"配置验证失败: {e}"}]
+        return reconcile_host_batch(zapi, batch, e, existing_before)
+
+    if "error" not in resp:
+        return [
+            {"status": "success", "host": host_ip, "hostid": hostid}
+            for (_, host_ip, _), hostid in zip(batch, resp["result"]["hostids"])
+        ]
+
+    if len(batch) == 1:
+        error_msg = f"{resp['error']['code']}: {resp['error']['data']}"
+        return [{"status": "error", "host": batch[0][1], "message": error_msg}]
+
+    mid = len(batch) // 2
+    return (submit_host_batch(zapi, batch[:mid], existing_before) +
+            submit_host_batch(zapi, batch[mid:], existing_before))
+
+def _column_values(df, column_key):
+    """获取 Excel 某列去重后的非空值（列不存在时返回空集合）"""
+    column = CONFIG["excel_columns"][column_key]
+    if column not in df.columns:
+        return set()
+    return {str(value).strip() for value in df[column].dropna() if str(value).strip()}
+
+def resolve_lookup_tables(zapi, df, group_name, snmp_template, agent_template):
+    """
+    一次性解析表格中引用的所有代理、主机组和模板名称，每类对象只发送一次 get 请求
+    :param zapi: Zabbix API 会话
+    :param df: 主机信息 DataFrame
+    :param group_name: 默认主机组名称
+    :param snmp_template: 默认 SNMP 模板名称
+    :param agent_template: 默认 Agent 模板名称
+    :return: (映射表 {"proxy"/"group"/"template": {名称: ID}}, 未解析的名称 {"proxy"/"group"/"template": [名称]})
+    """
+    proxy_names = _column_values(df, "proxy_name")
+    group_names = _column_values(df, "group_name") | {group_name}
+    template_names = _column_values(df, "template_name") | {snmp_template, agent_template}
+
+    lookups = {"proxy": {}, "group": {}, "template": {}}
+    if proxy_names:
+        proxies = zapi.proxy.get(filter={"host": sorted(proxy_names)}, output=["proxyid", "host"])
+        lookups["proxy"] = {proxy["host"]: proxy["proxyid"] for proxy in proxies}
+    groups = zapi.hostgroup.get(filter={"name": sorted(group_names)}, output=["groupid", "name"])
+    lookups["group"] = {group["name"]: group["groupid"] for group in groups}
+    templates = zapi.template.get(filter={"host": sorted(template_names)}, output=["templateid", "host"])
+    lookups["template"] = {template["host"]: template["templateid"] for template in templates}
+
+    unresolved = {
+        "proxy": sorted(proxy_names - lookups["proxy"].keys()),
+        "group": sorted(group_names - lookups["group"].keys()),
+        "template": sorted(template_names - lookups["template"].keys())
+    }
+    return lookups, {kind: names for kind, names in unresolved.items() if names}
+
+def create_hosts(file_path, group_name, snmp_template, agent_template, batch_size=1):
+    """
+    批量创建主入口函数（增强异常处理）
+    先一次性解析代理、主机组和模板并在本地校验所有行，然后按 batch_size 分批以数组形式提交 host.create，
+    批次失败时二分定位出错行，结果仍按行返回。
+    """
+    # 初始化API连接
+    try:
+        zapi = get_shared_zabbix_api()
+    except Exception as e:
+        return [{"status": "error", "message": f"API登录失败: {e}"}]
     
     # 读取数据
     try:
@@ -138,7 +272,20 @@ def create_hosts(file_path, group_name, snmp_template, agent_template):
     except Exception as e:
         return [{"status": "error", "message": str(e)}]
     
-    results = []
+    # 预解析代理、主机组和模板，未解析的名称在创建任何主机前统一报告；同时记录已存在的主机
+    try:
+        lookups, unresolved = resolve_lookup_tables(zapi, df, group_name, snmp_template, agent_template)
+        existing_before = get_existing_hosts(zapi, _column_values(df, "host_ip"))
+    except Exception as e:
+        return [{"status": "error", "message": f"配置验证失败: {e}"}]
+    if unresolved:
+        kind_names = {"proxy": "代理", "group": "主机组", "template": "模板"}
+        details = "; ".join(f"{kind_names[kind]}: {', '.join(names)}" for kind, names in unresolved.items())
+        return [{"status": "error", "message": f"配置验证失败，以下名称不存在: {details}"}]
+    
+    # 本地校验所有行，收集待提交的主机参数
+    row_results = {}
+    pending = []
     for index, row in df.iterrows():
         host_ip = row.get(CONFIG["excel_columns"]["host_ip"], "未知主机")
         try:
@@ -148,38 +295,33 @@ def create_hosts(file_path, group_name, snmp_template, agent_template):
             if sys_type not in ["snmp", "agent"]:
                 raise ValueError(f"无效监控类型: {sys_type_raw}")
             
-            # 选择模板
-            template_id = snmp_tid if sys_type == "snmp" else agent_tid
+            # 选择模板和主机组（表格中指定的优先）
+            template_name = get_cell_text(row, "template_name") or (
+                snmp_template if sys_type == "snmp" else agent_template)
+            template_id = lookups["template"][template_name.strip()]
+            row_group = get_cell_text(row, "group_name") or group_name
+            group_id = lookups["group"][row_group.strip()]
             
             # 构建请求参数
             params = create_host_params(
-                row, sys_type, template_id, group_id, zapi.auth
+                row, sys_type, template_id, group_id, zapi.auth, zapi, proxy_ids=lookups["proxy"]
             )
-            
-            # 发送请求
-            resp = requests.post(
-                zapi.url, 
-                headers={"Content-Type": "application/json-rpc"},
-                json=params,
-                timeout=10
-            ).json()
-            
-            if "error" in resp:
-                error_msg = f"{resp['error']['code']}: {resp['error']['data']}"
-                results.append({"status": "error", "host": host_ip, "message": error_msg})
-            else:
-                results.append({
-                    "status": "success",
-                    "host": host_ip,
-                    "hostid": resp["result"]["hostids"][0]
-                })
+            pending.append((index, host_ip, params["params"]))
         except Exception as e:
-            results.append({
+            row_results[index] = {
                 "status": "error",
                 "host": host_ip,
                 "message": f"第{index+2}行处理失败: {str(e)}"
-            })
-    return results
+            }
+
+    # 分批提交
+    batch_size = max(1, batch_size)
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        for (index, _, _), result in zip(batch, submit_host_batch(zapi, batch, existing_before)):
+            row_results[index] = result
+
+    return [row_results[index] for index in sorted(row_results)]
 
 if __name__ == "__main__":
     
@@ -187,10 +329,11 @@ if __name__ == "__main__":
         file_path="C:\\software\\host_info-20240325.xlsx",
         group_name="Poly话机",
         snmp_template="Template_Envision_SNMPGeneral",
-        agent_template="Envision_Temp_ICMPPing_Baseline"
+        agent_template="Envision_Temp_ICMPPing_Baseline",
+        batch_size=100
     )
     
     print("\n创建结果:")
     for res in results:
         status_icon = "✅" if res["status"] == "success" else "❌"
-        print(f"{status_icon} {res['host']}: {res.get('message', '创建成功')}")
\ No newline at end of file
+        print(f"{status_icon} {res.get('host', '-')}: {res.get('message', '创建成功')}")
\ No newline at end of file
@@ -1,79 +1,110 @@
 import csv
+import argparse
 from datetime import datetime, timedelta
 from pytz import timezone
-from login_zabbix_api import login_zabbix_api
-
-# 登录到 Zabbix API
-zapi = login_zabbix_api()
+from login_zabbix_api import get_shared_zabbix_api
 
 # 自定义维护名称前缀，可以根据需要修改
 MAINTENANCE_NAME_PREFIX = "Windows维护"
 
-def get_host_id_by_ip(ip_address):
-    """
-    根据 IP 地址获取 Zabbix 中的主机 ID
-    :param ip_address: 主机的 IP 地址
-    :return: 主机 ID 或 None（如果未找到主机）
-    """
-    try:
-        hosts = zapi.host.get(filter={"ip": ip_address}, output=["hostid"])
-        if hosts:
-            return hosts[0]['hostid']
-        else:
-            print(f"No host found with IP address {ip_address}")
-            return None
-    except Exception as e:
-        print(f"Error getting host ID for {ip_address}: {e}")
-        return None
+# 默认 CSV 文件路径
+DEFAULT_CSV_FILE = r'C:\software\maintenance.csv'
 
-def maintenance_exists(maintenance_name):
+# 默认批量参数：单次 hostinterface.get 的 IP 数量、单次 maintenance.create / update 的维护数量
+DEFAULT_IP_CHUNK_SIZE = 500
+DEFAULT_BATCH_SIZE = 100
+
+# 在原始时间上提前/延后的分钟数
+DEFAULT_PADDING_MINUTES = 30
+
+def get_maintenance_name(start_time, end_time, prefix=MAINTENANCE_NAME_PREFIX):
     """
-    检查指定名称的维护是否已经存在
-    :param maintenance_name: 维护名称
-    :return: True 如果存在，否则 False
+    生成维护名称（自定义前缀 + 时间范围），便于区分
     """
-    try:
-        maintenances = zapi.maintenance.get(filter={"name": maintenance_name})
-        return bool(maintenances)
-    except Exception as e:
-        print(f"Error checking maintenance existence for {maintenance_name}: {e}")
-        return False
+    return f"{prefix}-{start_time.strftime('%Y-%m-%d %H:%M')}-{end_time.strftime('%Y-%m-%d %H:%M')}"
 
-def create_maintenance(start_time, end_time, host_ids, maintenance_name):
+def build_maintenance_params(start_time, end_time, host_ids, maintenance_name):
     """
-    创建 Zabbix 中的维护模式，如果同名维护已存在，则跳过创建
+    构造 maintenance.create / maintenance.update 的参数
     :param start_time: 维护开始的本地时间
     :param end_time: 维护结束的本地时间
     :param host_ids: 主机 ID 的列表
     :param maintenance_name: 维护模式的名称
-    :return: 维护模式 ID 或 None（如果创建失败）
-    """
-    try:
-        tz = timezone('Asia/Shanghai')
-        start_time_unix = int(tz.localize(start_time).timestamp())
-        end_time_unix = int(tz.localize(end_time).timestamp())
-
-        # 如果同名维护已经存在，则跳过创建
-        if maintenance_exists(maintenance_name):
-            print(f"Maintenance '{maintenance_name}' already exists. Skipping creation.")
-            return
-
-        maintenance_id = zapi.maintenance.create({
-            "name": maintenance_name,
-            "active_since": start_time_unix,
-            "active_till": end_time_unix,
-            "hostids": host_ids,
-            "timeperiods": [{
-                "timeperiod_type": 0,  # 指定时间范围
-                "start_date": start_time_unix,
-                "period": end_time_unix - start_time_unix
-            }]
-        })
-        print(f"Created maintenance '{maintenance_name}' with ID: {maintenance_id}")
-        return maintenance_id
-    except Exception as e:
-        print(f"Error creating maintenance '{maintenance_name}': {e}")
-        return None
+    :return: 参数字典
+    """
+    tz = timezone('Asia/Shanghai')
+    start_time_unix = int(tz.localize(start_time).timestamp())
+    end_time_unix = int(tz.localize(end_time).timestamp())
+    return {
+        "name": maintenance_name,
+        "active_since": start_time_unix,
+        "active_till": end_time_unix,
+        "hostids": list(host_ids),
+        "timeperiods": [{
+            "timeperiod_type": 0,  # 指定时间范围
+            "start_date": start_time_unix,
+            "period": end_time_unix - start_time_unix
+        }]
+    }
+
+def merge_overlapping_windows(windows):
+    """
+    合并主机完全相同且时间重叠（或首尾相接）的维护时间段，
+    合并后时间范围相同的不同主机组再合并为一个维护（维护名称只由时间范围决定）
+    :param windows: [(开始时间, 结束时间, 主机 ID 列表)]
+    :return: 合并后的时间段列表
+    """
+    by_hosts = {}
+    for start_time, end_time, host_ids in windows:
+        by_hosts.setdefault(frozenset(host_ids), []).append((start_time, end_time, host_ids))
+
+    merged = []
+    for group in by_hosts.values():
+        group.sort(key=lambda window: window[0])
+        current_start, current_end, current_hosts = group[0]
+        for start_time, end_time, host_ids in group[1:]:
+            if start_time <= current_end:
+                current_end = max(current_end, end_time)
+            else:
+                merged.append((current_start, current_end, current_hosts))
+                current_start, current_end, current_hosts = start_time, end_time, host_ids
+        merged.append((current_start, current_end, current_hosts))
+
+    by_range = {}
+    for start_time, end_time, host_ids in merged:
+        by_range.setdefault((start_time, end_time), []).extend(host_ids)
+    return [(start_time, end_time, list(dict.fromkeys(host_ids)))
+            for (start_time, end_time), host_ids in sorted(by_range.items())]
+
+def plan_maintenances(windows, existing, prefix=MAINTENANCE_NAME_PREFIX):
+    """
+    将计划的维护时间段与服务器上已有的维护比对。
+    同名维护只追加主机（其他文件或上一次导入加入的主机保留在维护中），计划的主机都已在维护中且时间一致时跳过
+    :param windows: [(开始时间, 结束时间, 主机 ID 列表)]
+    :param existing: {维护名称: 维护信息（含 hosts）}
+    :param prefix: 维护名称前缀
+    :return: {"create": [参数], "update": [参数], "skip": [维护名称]}
+    """
+    plan = {"create": [], "update": [], "skip": []}
+    for start_time, end_time, host_ids in windows:
+        maintenance_name = get_maintenance_name(start_time, end_time, prefix)
+        params = build_maintenance_params(start_time, end_time, host_ids, maintenance_name)
+        current = existing.get(maintenance_name)
+        if current is None:
+            plan["create"].append(params)
+            continue
+
+        current_hosts = [host['hostid'] for host in current.get('hosts', [])]
+        if (set(params["hostids"]) <= set(current_hosts)
+                and int(current['active_since']) == params["active_since"]
+                and int(current['active_till']) == params["active_till"]):
+            plan["skip"].append(maintenance_name)
+        else:
+            # maintenance.update 会替换 hostids，需带上已在维护中的主机
+            params["hostids"] = list(dict.fromkeys(current_hosts + params["hostids"]))
+            params["maintenanceid"] = current['maintenanceid']
+            plan["update"].append(params)
+    return plan
 
 def parse_time(date_str, time_str):
     """
@@ -87,55 +118,214 @@ def parse_time(date_str, time_str):
         return datetime.strptime(date_str, '%Y/%m/%d') + timedelta(days=1)
     return datetime.strptime(f"{date_str} {time_str}", '%Y/%m/%d %H:%M')
 
-def read_and_process_csv(file_path):
+def read_schedule_csv(file_path, padding_minutes=DEFAULT_PADDING_MINUTES):
     """
-    读取 CSV 文件，解析数据并创建维护模式
+    读取维护计划 CSV 文件（IP, "YYYY/MM/DD HH:MM-HH:MM"），按时间段汇总 IP
     :param file_path: CSV 文件路径
+    :param padding_minutes: 在原始时间上提前开始、延后结束的分钟数
+    :return: {(开始时间, 结束时间): [IP 地址列表]}
+    """
+    # 用于存储同一时间段下对应的 IP 列表，避免重复创建维护
+    maintenance_dict = {}
+
+    with open(file_path, mode='r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        next(reader)  # 跳过表头
+        for row in reader:
+            ip_address, time_range_str = row[0], row[1]
+
+            # 分离日期和时间范围
+            date_str, time_range = time_range_str.split(' ')
+            start_time_str, end_time_str = time_range.split('-')
+
+            # 解析开始和结束时间
+            start_time = parse_time(date_str, start_time_str)
+            end_time = parse_time(date_str, end_time_str)
+
+            # 如果结束时间小于等于开始时间，说明跨天，需要加一天
+            if end_time <= start_time:
+                end_time += timedelta(days=1)
+
+            # 在原始时间上提前开始，延后结束
+            start_time_adjusted = start_time - timedelta(minutes=padding_minutes)
+            end_time_adjusted = end_time + timedelta(minutes=padding_minutes)
+
+            # 将相同时间段的主机归为一组
+            maintenance_dict.setdefault((start_time_adjusted, end_time_adjusted), []).append(ip_address)
+
+    return maintenance_dict
+
+
+class MaintenanceScheduler:
     """
-    try:
-        # 用于存储同一时间段下对应的主机 ID 列表，避免重复创建维护
-        maintenance_dict = {}
+    维护计划导入器：首次调用 API 时才登录，之后复用进程内共享的会话（过期自动重新登录），
+    可在常驻进程中反复处理多个维护计划文件。
+    """
+
+    def __init__(self, zapi=None, config_file="config.ini", config_section="Zabbix",
+                 prefix=MAINTENANCE_NAME_PREFIX, batch_size=DEFAULT_BATCH_SIZE,
+                 ip_chunk_size=DEFAULT_IP_CHUNK_SIZE, padding_minutes=DEFAULT_PADDING_MINUTES):
+        """
+        :param zapi: 已登录的 Zabbix API 对象（可选，默认使用共享会话）
+        :param config_file: 配置文件路径
+        :param config_section: 配置文件中Zabbix登录信息所在的节名
+        :param prefix: 维护名称前缀
+        :param batch_size: 单次 maintenance.create / maintenance.update 的维护数量
+        :param ip_chunk_size: 单次 hostinterface.get 的 IP 数量
+        :param padding_minutes: 在原始时间上提前开始、延后结束的分钟数
+        """
+        self._zapi = zapi
+        self.config_file = config_file
+        self.config_section = config_section
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.ip_chunk_size = ip_chunk_size
+        self.padding_minutes = padding_minutes
 
-        with open(file_path, mode='r', newline='', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            next(reader)  # 跳过表头
-            for row in reader:
-                ip_address, time_range_str = row[0], row[1]
+    @property
+    def zapi(self):
+        if self._zapi is not None:
+            return self._zapi
+        zapi = get_shared_zabbix_api(self.config_file, self.config_section)
+        if zapi is None:
+            raise RuntimeError("Failed to log in to Zabbix API")
+        return zapi
 
-                # 分离日期和时间范围
-                date_str, time_range = time_range_str.split(' ')
-                start_time_str, end_time_str = time_range.split('-')
+    def build_ip_index(self, ip_addresses):
+        """
+        批量查询主机接口，建立 IP 地址到主机 ID 的索引
+        :param ip_addresses: IP 地址列表
+        :return: {IP 地址: 主机 ID}
+        """
+        ip_addresses = sorted(set(ip_addresses))
+        ip_index = {}
+        for i in range(0, len(ip_addresses), self.ip_chunk_size):
+            chunk = ip_addresses[i:i + self.ip_chunk_size]
+            try:
+                interfaces = self.zapi.hostinterface.get(filter={"ip": chunk}, output=["hostid", "ip"])
+                for interface in interfaces:
+                    ip_index.setdefault(interface['ip'], interface['hostid'])
+            except Exception as e:
+                print(f"Error getting host IDs for {len(chunk)} IP addresses: {e}")
+        return ip_index
 
-                # 解析开始和结束时间
-                start_time = parse_time(date_str, start_time_str)
-                end_time = parse_time(date_str, end_time_str)
+    def load_existing_maintenances(self):
+        """
+        一次性加载名称以前缀开头的所有维护
+        :return: {维护名称: 维护信息（含 hosts）}
+        """
+        maintenances = self.zapi.maintenance.get(
+            search={"name": self.prefix},
+            startSearch=True,
+            output=["maintenanceid", "name", "active_since", "active_till"],
+            selectHosts=["hostid"]
+        )
+        return {m['name']: m for m in maintenances if m['name'].startswith(self.prefix)}
 
-                # 如果结束时间小于等于开始时间，说明跨天，需要加一天
-                if end_time <= start_time:
-                    end_time += timedelta(days=1)
+    def _submit_maintenances(self, method_name, params_list):
+        """
+        以数组形式批量提交 maintenance.create / maintenance.update，整批失败时逐个重试以定位出错的维护
+        :return: (成功的维护名称列表, 失败的维护名称列表)
+        """
+        method = getattr(self.zapi.maintenance, method_name)
+        succeeded, failed = [], []
+        for i in range(0, len(params_list), self.batch_size):
+            batch = params_list[i:i + self.batch_size]
+            try:
+                method(*batch)
+                succeeded.extend(params["name"] for params in batch)
+                continue
+            except Exception as e:
+                if len(batch) == 1:
+                    print(f"Error submitting maintenance '{batch[0]['name']}': {e}")
+                    failed.append(batch[0]["name"])
+                    continue
+                print(f"Batch of {len(batch)} maintenances failed, retrying one by one: {e}")
+            for params in batch:
+                try:
+                    method(params)
+                    succeeded.append(params["name"])
+                except Exception as e:
+                    print(f"Error submitting maintenance '{params['name']}': {e}")
+                    failed.append(params["name"])
+        return succeeded, failed
 
-                # 在原始时间上提前 30 分钟开始，延后 30 分钟结束
-                start_time_adjusted = start_time - timedelta(minutes=30)
-                end_time_adjusted = end_time + timedelta(minutes=30)
+    def sync_maintenances(self, windows, merge_overlaps=False):
+        """
+        一次性比对已有维护，批量创建新维护、更新主机或时间变化的维护
+        :param windows: [(开始时间, 结束时间, 主机 ID 列表)]
+        :param merge_overlaps: 是否合并同一组主机的重叠时间段
+        :return: {"created": [...], "updated": [...], "skipped": [...], "failed": [...]}（均为维护名称）
+        """
+        if merge_overlaps:
+            merged = merge_overlapping_windows(windows)
+            if len(merged) < len(windows):
+                print(f"Merged {len(windows)} maintenance windows into {len(merged)}")
+            windows = merged
 
-                # 生成维护名称（自定义前缀 + 时间范围），便于区分
-                maintenance_name = f"{MAINTENANCE_NAME_PREFIX}-{start_time_adjusted.strftime('%Y-%m-%d %H:%M')}-{end_time_adjusted.strftime('%Y-%m-%d %H:%M')}"
+        plan = plan_maintenances(windows, self.load_existing_maintenances(), self.prefix)
+        created, create_failed = self._submit_maintenances("create", plan["create"])
+        updated, update_failed = self._submit_maintenances("update", plan["update"])
+        report = {"created": created, "updated": updated, "skipped": plan["skip"], "failed": create_failed + update_failed}
+        print(f"Maintenances: {len(created)} created, {len(updated)} updated, "
+              f"{len(plan['skip'])} unchanged, {len(report['failed'])} failed")
+        return report
 
-                # 将相同时间段的主机归为一组
-                maintenance_dict.setdefault((start_time_adjusted, end_time_adjusted, maintenance_name), []).append(get_host_id_by_ip(ip_address))
+    def process_csv(self, file_path, merge_overlaps=False):
+        """
+        读取 CSV 文件，解析数据并创建维护模式
+        :param file_path: CSV 文件路径
+        :param merge_overlaps: 是否合并同一组主机的重叠时间段
+        :return: sync_maintenances 的结果，处理失败时返回 None
+        """
+        try:
+            maintenance_dict = read_schedule_csv(file_path, self.padding_minutes)
+
+            # 一次性解析所有 IP，未知 IP 统一报告
+            ip_index = self.build_ip_index(ip for ips in maintenance_dict.values() for ip in ips)
+            unknown_ips = sorted({ip for ips in maintenance_dict.values() for ip in ips if ip not in ip_index})
+            if unknown_ips:
+                print(f"No host found for {len(unknown_ips)} IP addresses: {', '.join(unknown_ips)}")
+
+            # 过滤掉未找到的主机，汇总为待同步的维护时间段
+            windows = []
+            for (start_time, end_time), ips in maintenance_dict.items():
+                host_ids = list(dict.fromkeys(ip_index[ip] for ip in ips if ip in ip_index))
+                if host_ids:
+                    windows.append((start_time, end_time, host_ids))
+
+            return self.sync_maintenances(windows, merge_overlaps=merge_overlaps)
+
+        except Exception as e:
+            print(f"Error processing CSV file: {e}")
+            return None
+
+
+def read_and_process_csv(file_path, merge_overlaps=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    读取 CSV 文件，解析数据并创建维护模式（使用共享会话）
+    :param file_path: CSV 文件路径
+    :param merge_overlaps: 是否合并同一组主机的重叠时间段
+    :param batch_size: 单次批量提交的维护数量
+    """
+    return MaintenanceScheduler(batch_size=batch_size).process_csv(file_path, merge_overlaps=merge_overlaps)
 
-        # 遍历所有时间段，创建维护模式
-        for (start_time, end_time, maintenance_name), host_ids in maintenance_dict.items():
-            # 过滤掉 None 值
-            host_ids = [host_id for host_id in host_ids if host_id is not None]
-            if host_ids:
-                create_maintenance(start_time, end_time, host_ids, maintenance_name)
+def main():
+    parser = argparse.ArgumentParser(description="根据 CSV 维护计划批量创建 Zabbix 维护")
+    parser.add_argument('csv_files', nargs='*', default=[DEFAULT_CSV_FILE], help=f'维护计划 CSV 文件 (默认: {DEFAULT_CSV_FILE})')
+    parser.add_argument('--config', type=str, default='config.ini', help='配置文件路径 (默认: config.ini)')
+    parser.add_argument('--section', type=str, default='Zabbix', help='配置文件中的节名 (默认: Zabbix)')
+    parser.add_argument('--prefix', type=str, default=MAINTENANCE_NAME_PREFIX, help=f'维护名称前缀 (默认: {MAINTENANCE_NAME_PREFIX})')
+    parser.add_argument('--padding-minutes', type=int, default=DEFAULT_PADDING_MINUTES, help=f'维护时间前后扩展的分钟数 (默认: {DEFAULT_PADDING_MINUTES})')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help=f'单次批量提交的维护数量 (默认: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--merge-overlaps', action='store_true', help='合并同一组主机的重叠维护时间段')
 
-    except Exception as e:
-        print(f"Error processing CSV file: {e}")
+    args = parser.parse_args()
 
-# CSV 文件路径
-csv_file_path = r'C:\software\maintenance.csv'
+    scheduler = MaintenanceScheduler(config_file=args.config, config_section=args.section, prefix=args.prefix,
+                                     batch_size=args.batch_size, padding_minutes=args.padding_minutes)
+    for csv_file in args.csv_files:
+        scheduler.process_csv(csv_file, merge_overlaps=args.merge_overlaps)
 
-# 读取并处理 CSV 文件
-read_and_process_csv(csv_file_path)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _window_mean(segment):
+    """
+    计算窗口均值（忽略NaN，与pandas的Series.mean()一致）
+    """
+    mask = ~np.isnan(segment)
+    count = mask.sum()
+    if count == 0:
+        return np.nan
+    return segment[mask].sum() / count
+
+
+def _is_spike(values, i, window_size, threshold):
+    """
+    按原始逐点逻辑判断第i个点是否为瞬间异常峰值
+    """
+    n = values.size
+    prev_avg = _window_mean(values[max(0, i - window_size):i])
+    next_avg = _window_mean(values[i + 1:min(n, i + window_size + 1)])
+    current = values[i]
+    return abs(current - prev_avg) > threshold and abs(current - next_avg) > threshold
+
+
+def _spike_flags(values, window_size, threshold):
+    """
+    基于滑动窗口视图一次性计算所有点的前后窗口均值，返回异常点标记数组
+    """
+    n = values.size
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    pad = np.zeros(window_size)
+
+    # 首尾补零后，第i个点的前向窗口为windows[i]，后向窗口为windows[i + window_size + 1]
+    value_windows = sliding_window_view(np.concatenate([pad, filled, pad]), window_size)
+    count_windows = sliding_window_view(np.concatenate([pad, valid.astype(np.float64), pad]), window_size)
+    sums = value_windows.sum(axis=1)
+    counts = count_windows.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+    prev_avg = means[:n]
+    next_avg = means[window_size + 1:window_size + 1 + n]
+
+    with np.errstate(invalid='ignore'):
+        flags = (np.abs(values - prev_avg) > threshold) & (np.abs(values - next_avg) > threshold)
+    # 首尾点没有完整的前后参考，原逻辑直接跳过
+    flags[0] = False
+    flags[-1] = False
+    return flags
+
+
+def smooth_spikes_array(values, window_size=5, threshold=80):
+    """
+    平滑瞬间异常峰值（NumPy实现）
+
+    与逐点实现语义一致：前向窗口使用已平滑的值，后向窗口使用原始值。
+    先用滑动窗口一次性算出所有点的判定结果，只有被替换点之后的window_size个点
+    （前向窗口受影响）才逐点复核，其余点直接采用批量结果。
+    参数：
+        values: 一维数组 时间序列数据
+        window_size: 前后参考窗口大小（数据点数量）
+        threshold: 判定为异常的百分比阈值
+    返回：
+        平滑后的float64数组
+    """
+    smoothed = np.array(values, dtype=np.float64)
+    n = smoothed.size
+    if n < 3 or window_size < 1:
+        return smoothed
+
+    candidates = np.flatnonzero(_spike_flags(smoothed, window_size, threshold))
+    pos = 0
+    while True:
+        k = np.searchsorted(candidates, pos)
+        if k >= candidates.size:
+            break
+
+        # 该点的前向窗口内没有被替换过的值，批量判定结果有效
+        i = candidates[k]
+        smoothed[i] = (smoothed[i - 1] + smoothed[i + 1]) / 2
+        last_modified = i
+
+        # 替换点会影响其后window_size个点的前向窗口，逐点复核
+        j = i + 1
+        while j < n - 1 and j <= last_modified + window_size:
+            if _is_spike(smoothed, j, window_size, threshold):
+                smoothed[j] = (smoothed[j - 1] + smoothed[j + 1]) / 2
+                last_modified = j
+            j += 1
+        pos = j
+
+    return smoothed
+
+
+def smooth_spikes(series, window_size=5, threshold=80):
+    """
+    平滑瞬间异常峰值
+    参数：
+        series: pd.Series 时间序列数据
+        window_size: 前后参考窗口大小（数据点数量）
+        threshold: 判定为异常的百分比阈值
+    返回：
+        平滑后的Series
+    """
+    values = smooth_spikes_array(series.to_numpy(dtype=np.float64), window_size, threshold)
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def smooth_spikes_sequential(series, window_size=5, threshold=80):
+    """
+    平滑瞬间异常峰值（原逐点实现，保留用于结果比对）
+    参数：
+        series: pd.Series 时间序列数据
+        window_size: 前后参考窗口大小（数据点数量）
+        threshold: 判定为异常的百分比阈值
+    返回：
+        平滑后的Series
+    """
+    smoothed = series.copy()
+    n = len(smoothed)
+    for i in range(n):
+        current = smoothed.iloc[i]
+
+        # 计算前向参考窗口
+        start_prev = max(0, i - window_size)
+        prev_points = smoothed.iloc[start_prev:i]
+
+        # 计算后向参考窗口
+        end_next = min(n, i + window_size + 1)
+        next_points = smoothed.iloc[i+1:end_next]
+
+        # 跳过首尾不足的情况
+        if len(prev_points) == 0 or len(next_points) == 0:
+            continue
+
+        # 计算前后窗口平均值
+        prev_avg = prev_points.mean()
+        next_avg = next_points.mean()
+
+        # 异常点判定逻辑
+        if abs(current - prev_avg) > threshold and abs(current - next_avg) > threshold:
+            # 使用相邻点均值替换
+            if i > 0 and i < n-1:
+                new_value = (smoothed.iloc[i-1] + smoothed.iloc[i+1]) / 2
+            elif i == 0:
+                new_value = smoothed.iloc[i+1]
+            else:
+                new_value = smoothed.iloc[i-1]
+
+            smoothed.iloc[i] = new_value
+
+    return smoothed
+
@@ -2,14 +2,14 @@ import logging
 import pandas as pd
 import json
 import argparse
-from login_zabbix_api import login_zabbix_api
+from login_zabbix_api import login_zabbix_pool
+from trigger_bulk import (DEFAULT_MAX_WORKERS, DEFAULT_UPDATE_CHUNK_SIZE, build_trigger_row,
+                          resolve_hosts_by_name, fetch_triggers_for_hosts, current_status_from_rows,
+                          bulk_update_trigger_status)
 
 # 设置日志记录格式
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-STATUS_MAP = {"0": "正常", "1": "问题"}
-VALUE_MAP = {"0": "启用", "1": "禁用"}
-
 def get_host_id_by_name(zabbix_api, host_name):
     try:
         host_info = zabbix_api.host.get(filter={"host": host_name}, output=["hostid", "name", "host"])
@@ -30,34 +30,17 @@ def get_trigger_info(zabbix_api, host_id, host_name, host_ip, trigger_name=None)
 
         trigger_info_list = []
         for trigger in triggers:
-            tags = trigger.get("tags", [])
-            tag_info = {
-                "Host Name": host_name,
-                "Host IP": host_ip,
-                "Trigger ID": trigger.get("triggerid", "未知Trigger ID"),
-                "Trigger Name": trigger.get("description", "未知Trigger Name"),
-                "Trigger Status": STATUS_MAP.get(trigger.get("value"), "未知"),
-                "Trigger Enabled": VALUE_MAP.get(trigger.get("status"), "未知"),
-            }
-            for tag in tags:
-                tag_name = tag.get('tag')
-                tag_value = tag.get('value')
-                if tag_name in tag_info:
-                    existing_value = tag_info[tag_name]
-                    if isinstance(existing_value, list):
-                        tag_info[tag_name].append(tag_value)
-                    else:
-                        tag_info[tag_name] = [existing_value, tag_value]
-                else:
-                    tag_info[tag_name] = tag_value
-
+            tag_info = build_trigger_row(trigger, host_name, host_ip)
             trigger_info_list.append(tag_info)
         return trigger_info_list
     except Exception as e:
         logging.error(f"从 Zabbix API 获取触发器信息时发生错误: {e}")
         return []
 
-def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None):
+def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    批量处理 Excel 中的主机：一次 host.get 解析所有主机名，再按主机分块并发拉取触发器。
+    """
     try:
         df = pd.read_excel(file_path)
         if 'Host Name' not in df.columns:
@@ -65,13 +48,15 @@ def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None):
             return []
 
         host_names = df['Host Name'].dropna().unique()
-        all_trigger_info = []
+        hosts, missing = resolve_hosts_by_name(zabbix_api, list(host_names))
+        for host_name in missing:
+            logging.warning(f"主机名 {host_name} 的主机未找到")
 
-        for host_name in host_names:
-            host_id, host_name_resolved, host_ip = get_host_id_by_name(zabbix_api, host_name)
-            if host_id:
-                trigger_info = get_trigger_info(zabbix_api, host_id, host_name_resolved, host_ip, trigger_name)
-                all_trigger_info.extend(trigger_info)
+        triggers_by_host = fetch_triggers_for_hosts(zabbix_api, list(hosts), trigger_name, max_workers=max_workers)
+        all_trigger_info = []
+        for hostid, host in hosts.items():
+            for trigger in triggers_by_host.get(hostid, []):
+                all_trigger_info.append(build_trigger_row(trigger, host.get("name", "未知Host Name"), host.get("host", "未知Host IP")))
 
         return all_trigger_info
     except Exception as e:
@@ -97,6 +82,9 @@ def main():
     parser.add_argument('--file-path', type=str, help='输入 Excel 文件路径 (如果输入主机名则不需要)')
     parser.add_argument('--trigger-name', type=str, help='输入触发器名称 (可空)')
     parser.add_argument('--trigger-status', type=int, choices=[0, 1], help='设置触发器状态 (0: 启用, 1: 禁用)')
+    parser.add_argument('--bulk', action='store_true', help='批量模式：只更新状态不同的触发器，并按块以数组形式提交')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_UPDATE_CHUNK_SIZE, help=f'批量模式下单次更新的触发器数量 (默认: {DEFAULT_UPDATE_CHUNK_SIZE})')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS, help=f'批量拉取触发器的并发数 (默认: {DEFAULT_MAX_WORKERS})')
 
     args = parser.parse_args()
 
@@ -104,10 +92,10 @@ def main():
         logging.error("请仅输入主机名或 Excel 文件路径，不能同时输入两者")
         return
 
-    zabbix_api = login_zabbix_api()
+    zabbix_api = login_zabbix_pool(pool_size=args.max_workers)
 
     if args.file_path:
-        trigger_info = process_hosts_from_excel(args.file_path, zabbix_api, args.trigger_name)
+        trigger_info = process_hosts_from_excel(args.file_path, zabbix_api, args.trigger_name, args.max_workers)
     elif args.host_name:
         host_id, host_name_resolved, host_ip = get_host_id_by_name(zabbix_api, args.host_name)
         if host_id:
@@ -122,7 +110,12 @@ def main():
         for index, info in enumerate(trigger_info):
             print(f"{index + 1}: {json.dumps(info, ensure_ascii=False, indent=4)}")
 
-        if args.trigger_status is not None:
+        if args.trigger_status is not None and args.bulk:
+            report = bulk_update_trigger_status(zabbix_api, current_status_from_rows(trigger_info),
+                                                args.trigger_status, chunk_size=args.chunk_size)
+            for failure in report["failed"]:
+                print(f"更新失败: 触发器 ID {failure['triggerid']}: {failure['error']}")
+        elif args.trigger_status is not None:
             for info in trigger_info:
                 trigger_id = info.get("Trigger ID")
                 if trigger_id:
@@ -141,4 +134,9 @@ if __name__ == "__main__":
 # **启用触发器**：
 # ```bash
 # python c://software/zabbix_api/export_trigger_tags.py --host-name "10.93.203.58" --trigger-name "Ping 连续三次不通" --trigger-status 0
+# ```
+
+# **批量禁用 Excel 中所有主机的触发器**：
+# ```bash
+# python c://software/zabbix_api/export_trigger_tags.py --file-path "C:\software\hosts.xlsx" --trigger-name "Ping 连续三次不通" --trigger-status 1 --bulk
 # ```
\ No newline at end of file
@@ -1,32 +1,85 @@
-import pandas as pd
 import logging
 from pyzabbix import ZabbixAPI  # 导入 ZabbixAPI 类
 from login_zabbix_api import login_zabbix_api
-from search_hosts_api import get_host_info  # 假设代码1保存为 search_hosts_api.py
+from search_hosts_api import HOST_INFO_DTYPES, get_host_interface_info
+from report_sink import open_sink
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def export_to_file(data: list, file_path: str, file_format: str = "csv"):
+def export_to_file(data, file_path: str, file_format: str = "csv", dtypes: dict = None):
     """
-    将数据导出到指定文件。
-    :param data: 待导出的数据列表
+    将数据流式导出到指定文件，逐行写入，不在内存中构建 DataFrame。
+    :param data: 待导出的数据（字典的列表或可迭代对象；为列表时列取所有记录字段的并集，否则取第一条记录的字段）
     :param file_path: 文件路径
-    :param file_format: 文件格式（支持 "csv" 或 "xlsx"）
+    :param file_format: 文件格式（支持 "csv"、"xlsx" 或 "parquet"，parquet 时 file_path 为输出目录）
+    :param dtypes: {列名: 列类型}，parquet 输出时使用，默认为None（按数据推断）
     """
     try:
-        df = pd.DataFrame(data)
-        if file_format.lower() == "csv":
-            df.to_csv(file_path, index=False, encoding='utf-8-sig')
-        elif file_format.lower() == "xlsx":
-            df.to_excel(file_path, index=False, engine='openpyxl')
-        else:
-            raise ValueError("不支持的文件格式，仅支持 'csv' 和 'xlsx'")
-        logging.info(f"数据成功导出到 {file_path}")
+        sink = open_sink(file_path, file_format)
+        with sink:
+            columns = list(dict.fromkeys(key for row in data for key in row)) if isinstance(data, list) else None
+            sink.add_sheet("Sheet1", columns, dtypes)
+            sink.write_rows("Sheet1", data)
+        logging.info(f"数据成功导出到 {file_path}，共 {sink.row_count()} 条记录")
     except Exception as e:
         logging.exception(f"导出文件失败: {e}")
         raise
 
+def search_triggers_by_templates(zapi: ZabbixAPI, trigger_keyword: str, template_list: list, chunk_size: int = 200) -> list:
+    """
+    以触发器为中心查询：由服务端按触发器名称过滤，只返回匹配的触发器。
+    模板、主机各查询一次，触发器按主机分块查询。
+    :param zapi: 已登录的 Zabbix API 对象
+    :param trigger_keyword: 触发器名称关键字
+    :param template_list: 模板名称列表（模糊匹配）
+    :param chunk_size: 单次 trigger.get 的主机数量
+    :return: 主机与触发器信息列表
+    """
+    templates = zapi.template.get(output=["templateid"], search={"name": template_list}, searchByAny=True)
+    if not templates:
+        logging.warning(f"未找到模板: {template_list}")
+        return []
+
+    hosts = zapi.host.get(
+        output=["hostid", "host", "status"],
+        templateids=[template["templateid"] for template in templates],
+        selectInterfaces=["ip", "type"]
+    )
+    host_map = {host["hostid"]: host for host in hosts}
+    host_ids = sorted(host_map, key=int)
+    logging.info(f"模板关联主机共 {len(host_ids)} 台")
+
+    all_data = []
+    for i in range(0, len(host_ids), chunk_size):
+        triggers = zapi.trigger.get(
+            hostids=host_ids[i:i + chunk_size],
+            search={"description": trigger_keyword},
+            output=["triggerid", "description", "status"],
+            selectHosts=["hostid"]
+        )
+        for trigger in triggers:
+            # 服务端搜索不区分大小写，这里保持原有的区分大小写匹配
+            if trigger_keyword not in trigger.get("description", ""):
+                continue
+            for trigger_host in trigger.get("hosts", []):
+                host = host_map.get(trigger_host["hostid"])
+                if host is None:
+                    continue
+                ip, _ = get_host_interface_info(host)
+                all_data.append({
+                    "主机ID": host["hostid"],
+                    "主机名称": host.get("host", ""),
+                    "IP地址": ip,
+                    "是否启用": "启用" if host.get("status") == "0" else "禁用",
+                    "Trigger ID": trigger.get("triggerid"),
+                    "Trigger Name": trigger.get("description"),
+                    "Trigger 是否启用": "启用" if trigger.get("status") == "0" else "禁用"
+                })
+
+    all_data.sort(key=lambda row: (int(row["主机ID"]), int(row["Trigger ID"])))
+    return all_data
+
 def search_and_export_by_trigger_and_template(
     zapi: ZabbixAPI, trigger_keyword: str, template_list: list, file_path: str, file_format: str = "csv"
 ):
@@ -36,25 +89,16 @@ def search_and_export_by_trigger_and_template(
     :param trigger_keyword: 触发器名称关键字
     :param template_list: 模板名称列表
     :param file_path: 导出文件路径
-    :param file_format: 导出文件格式（支持 'csv' 和 'xlsx'）
+    :param file_format: 导出文件格式（支持 'csv'、'xlsx' 和 'parquet'）
     """
     logging.info(f"开始查询主机，触发器关键字: {trigger_keyword}, 模板列表: {template_list}")
-    all_data = []
-
-    # 定义需要返回的字段列表
-    return_fields = ["主机ID", "主机名称", "IP地址", "是否启用", "Trigger ID", "Trigger Name", "Trigger 是否启用"]
-
-    for template_name in template_list:
-        logging.info(f"查询模板名称: {template_name}")
-        host_data = get_host_info(zapi, template_name=template_name, return_fields=return_fields)
-        filtered_data = [host for host in host_data if trigger_keyword in host.get("Trigger Name", "")]
-        all_data.extend(filtered_data)
+    all_data = search_triggers_by_templates(zapi, trigger_keyword, template_list)
 
     if not all_data:
         logging.warning("未查询到匹配的主机信息")
         return
 
-    export_to_file(all_data, file_path, file_format)
+    export_to_file(all_data, file_path, file_format, dtypes=HOST_INFO_DTYPES)
 
 if __name__ == "__main__":
     try:
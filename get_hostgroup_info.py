@@ -1,9 +1,10 @@
 import json
-from login_zabbix_api import login_zabbix_api
+from login_zabbix_api import get_shared_zabbix_api
 
-def get_hostgroup_info(group_name):
-    # 登录 Zabbix API
-    zapi = login_zabbix_api()
+def get_hostgroup_info(group_name, zapi=None):
+    # 未传入会话时复用进程内共享的 Zabbix API 会话
+    if zapi is None:
+        zapi = get_shared_zabbix_api()
 
     # 获取主机组信息
     groups = zapi.hostgroup.get(filter={"name": group_name}, output=["groupid", "name"])
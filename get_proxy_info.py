@@ -1,9 +1,10 @@
-from login_zabbix_api import login_zabbix_api
+from login_zabbix_api import get_shared_zabbix_api
 import json
 
-def get_proxy_info(agent_name):
-    # 登录 Zabbix API
-    zapi = login_zabbix_api()
+def get_proxy_info(agent_name, zapi=None):
+    # 未传入会话时复用进程内共享的 Zabbix API 会话
+    if zapi is None:
+        zapi = get_shared_zabbix_api()
 
     # 获取指定名称的代理服务器信息
     proxies = zapi.proxy.get(filter={"host": agent_name}, output=["proxyid", "host"])
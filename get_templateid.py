@@ -1,5 +1,5 @@
 import json
-from login_zabbix_api import login_zabbix_api
+from login_zabbix_api import get_shared_zabbix_api
 
 def get_template_info(template_name, zapi=None):
     """
@@ -7,15 +7,15 @@ def get_template_info(template_name, zapi=None):
 
     Args:
         template_name (str): 模板名称
-        zapi (ZabbixAPI, optional): Zabbix API 的连接对象。如果未提供，则会自动登录 Zabbix API。
+        zapi (ZabbixAPI, optional): Zabbix API 的连接对象。如果未提供，则复用进程内共享的 Zabbix API 会话。
 
     Returns:
         str: 包含模板信息的 JSON 格式字符串
     """
     try:
         if zapi is None:
-            # 登录 Zabbix API
-            zapi = login_zabbix_api()
+            # 复用共享会话，避免每次查询都重新登录
+            zapi = get_shared_zabbix_api()
         
         # 获取模板信息
         templates = zapi.template.get(filter={"host": template_name}, output=["templateid", "name"])
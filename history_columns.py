@@ -0,0 +1,76 @@
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta, timezone
+
+
+def empty_columns():
+    """空的 (clock, value) 列"""
+    return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+
+def decode_history(rows, value_field="value"):
+    """
+    将 history.get / trend.get 返回的记录直接解析为列式数组，按 clock 升序排列
+    :param rows: 记录列表（clock 和数值为字符串）
+    :param value_field: 数值字段（历史数据为 value，趋势数据为 value_avg / value_max 等）
+    :return: (int64 clock 数组, float64 数值数组)
+    """
+    n = len(rows)
+    if n == 0:
+        return empty_columns()
+    clocks = np.fromiter((row["clock"] for row in rows), dtype=np.int64, count=n)
+    values = np.fromiter((row[value_field] for row in rows), dtype=np.float64, count=n)
+    if n > 1 and (np.diff(clocks) < 0).any():
+        order = np.argsort(clocks, kind="stable")
+        clocks, values = clocks[order], values[order]
+    return clocks, values
+
+
+def decode_history_by_item(history_by_item, value_field="value"):
+    """
+    逐个监控项解析为列式数组，解析后即从原字典移除，避免两份数据同时占用内存
+    :param history_by_item: {itemid: 记录列表}
+    :return: {itemid: (clock 数组, 数值数组)}
+    """
+    columns = {}
+    for itemid in list(history_by_item):
+        columns[itemid] = decode_history(history_by_item.pop(itemid), value_field)
+    return columns
+
+
+def split_columns_by_day(clocks, values, start_date_dt, end_date_dt, utc=False):
+    """
+    将按 clock 升序排列的列式数据按本地日期拆分（返回视图，不复制数据）。
+    每天为左闭右开区间 [当日 00:00, 次日 00:00)：原脚本按天查询时 time_till 包含次日 00:00 的数据，
+    该点会同时计入前后两天，完整一天的重采样数据点数为 1441，这里为 1440。
+    :param utc: 按 UTC 日期拆分，日期范围为本地开始/结束时间对应的 UTC 日期
+    :return: {"%Y%m%d": (clock 数组, 数值数组)}
+    """
+    if utc:
+        start_date_dt = datetime.fromtimestamp(start_date_dt.timestamp(), timezone.utc)
+        end_date_dt = datetime.fromtimestamp(end_date_dt.timestamp(), timezone.utc)
+    current_date = start_date_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    days, bounds = [], []
+    while current_date <= end_date_dt:
+        days.append(current_date.strftime("%Y%m%d"))
+        bounds.append(int(current_date.timestamp()))
+        current_date += timedelta(days=1)
+    bounds.append(int(current_date.timestamp()))
+
+    edges = np.searchsorted(clocks, bounds, side="left")
+    return {day: (clocks[edges[i]:edges[i + 1]], values[edges[i]:edges[i + 1]]) for i, day in enumerate(days)}
+
+
+def to_local_datetime_index(clocks):
+    """
+    将时间戳数组转换为本地时间的 DatetimeIndex（与 datetime.fromtimestamp 一致）。
+    首尾 UTC 偏移相同时整体加偏移量向量化转换，跨越夏令时切换时逐个转换。
+    """
+    if clocks.size == 0:
+        return pd.DatetimeIndex([])
+    first_offset = time.localtime(int(clocks[0])).tm_gmtoff
+    last_offset = time.localtime(int(clocks[-1])).tm_gmtoff
+    if first_offset == last_offset:
+        return pd.DatetimeIndex(pd.to_datetime(clocks + first_offset, unit="s"))
+    return pd.DatetimeIndex([datetime.fromtimestamp(int(clock)) for clock in clocks])
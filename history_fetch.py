@@ -0,0 +1,357 @@
+import time
+import logging
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from login_zabbix_api import ZabbixClientPool
+from adaptive_concurrency import get_shared_limiter
+from history_windows import (HISTORY_FLOAT, HISTORY_UINT, DEFAULT_MAX_ITEMS_PER_REQUEST, DEFAULT_CHUNK_SECONDS,
+                             DEFAULT_MAX_ROWS_PER_REQUEST, chunks, plan_windows, split_window)
+
+
+def _worker_count(concurrent, tasks):
+    """
+    并发拉取使用的线程数：取共享并发控制器当前的并发上限（而不是上限的最大值），
+    避免每次调用都启动大量只在控制器中等待的线程及其会话；实际在途请求数仍由控制器决定
+    """
+    max_workers = get_shared_limiter().limit if concurrent else 1
+    return max(1, min(max_workers, tasks or 1))
+
+
+def _api_get(method, max_retries, **params):
+    """带重试的 history.get / trend.get 调用，由共享的自适应并发控制器限流并按指数退避重试"""
+    return get_shared_limiter().call(method, max_retries=max_retries, **params)
+
+
+def _history_request(zapi, history):
+    """构造 history.get 请求函数"""
+    def request(itemids, time_from, time_till, limit, max_retries):
+        return _api_get(zapi.history.get, max_retries,
+                        itemids=itemids,
+                        history=history,
+                        time_from=time_from,
+                        time_till=time_till,
+                        output=["itemid", "clock", "value"],
+                        sortfield="clock",
+                        sortorder="ASC",
+                        limit=limit)
+    return request
+
+
+def _trend_request(zapi):
+    """构造 trend.get 请求函数（trend.get 不支持排序，结果在本地排序）"""
+    def request(itemids, time_from, time_till, limit, max_retries):
+        return _api_get(zapi.trend.get, max_retries,
+                        itemids=itemids,
+                        time_from=time_from,
+                        time_till=time_till,
+                        output=["itemid", "clock", "num", "value_min", "value_avg", "value_max"],
+                        limit=limit)
+    return request
+
+
+def _fetch_window(request, itemids, start, stop, max_rows, max_retries, result):
+    """
+    拉取 [start, stop) 时间段内一组监控项的数据。
+    响应行数达到上限时说明结果被截断，先按监控项二分，单个监控项再按时间二分。
+    """
+    rows = request(itemids, start, stop - 1, max_rows, max_retries)
+    if len(rows) < max_rows:
+        for row in rows:
+            result[row["itemid"]].append(row)
+        return 1
+
+    halves = split_window(itemids, start, stop)
+    if halves:
+        return sum(_fetch_window(request, ids, lo, hi, max_rows, max_retries, result) for ids, lo, hi in halves)
+
+    logging.warning(f"监控项 {itemids[0]} 在 {start} 秒内的数据超过 {max_rows} 行，结果可能不完整")
+    for row in rows:
+        result[row["itemid"]].append(row)
+    return 1
+
+
+def _fetch_chunked(request, itemids, time_from, time_till, max_items_per_request, chunk_seconds, max_rows, max_retries,
+                   concurrent=False):
+    """
+    按监控项数量和时间分片批量拉取，返回 {itemid: 按 clock 升序排列的记录列表} 和请求次数。
+    concurrent 为 True 时各分片并发执行，实际在途请求数由共享并发控制器决定。
+    """
+    itemids = list(dict.fromkeys(str(itemid) for itemid in itemids))
+    result = {itemid: [] for itemid in itemids}
+    windows = plan_windows(itemids, time_from, time_till, max_items_per_request, chunk_seconds)
+
+    def fetch(window):
+        item_chunk, start, stop = window
+        return _fetch_window(request, item_chunk, start, stop, max_rows, max_retries, result)
+
+    with ThreadPoolExecutor(max_workers=_worker_count(concurrent, len(windows))) as executor:
+        requests_sent = sum(executor.map(fetch, windows))
+
+    # 并发分片的完成顺序不确定，trend.get 也不支持排序，统一在本地排序
+    for rows in result.values():
+        rows.sort(key=lambda row: int(row["clock"]))
+    return result, requests_sent
+
+
+def fetch_history(zapi, itemids, time_from, time_till, history=HISTORY_FLOAT,
+                  max_items_per_request=DEFAULT_MAX_ITEMS_PER_REQUEST,
+                  chunk_seconds=DEFAULT_CHUNK_SECONDS,
+                  max_rows=DEFAULT_MAX_ROWS_PER_REQUEST,
+                  max_retries=3):
+    """
+    批量拉取多个监控项的历史数据，按监控项数量、时间分片和响应大小切分请求，
+    再在本地按监控项拆分结果。传入 ZabbixClientPool 时各分片并发请求。
+    :param zapi: 登录后的 Zabbix API 对象
+    :param itemids: 监控项ID列表
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :param history: 历史数据类型（0: 浮点, 3: 整数）
+    :param max_items_per_request: 单次请求包含的监控项数量上限
+    :param chunk_seconds: 单次请求覆盖的时间长度（秒）
+    :param max_rows: 单次请求返回的行数上限，达到上限时自动拆分请求
+    :param max_retries: 单次请求的最大重试次数
+    :return: {itemid: [按 clock 升序排列的历史记录]}
+    """
+    result, requests_sent = _fetch_chunked(_history_request(zapi, history), itemids, time_from, time_till,
+                                           max_items_per_request, chunk_seconds, max_rows, max_retries,
+                                           concurrent=isinstance(zapi, ZabbixClientPool))
+    if requests_sent:
+        logging.info(f"history.get 共请求 {requests_sent} 次，监控项 {len(result)} 个，记录 {sum(len(r) for r in result.values())} 条")
+    return result
+
+
+def fetch_history_for_items(zapi, items, time_from, time_till, **kwargs):
+    """
+    按监控项自身的 value_type 分组批量拉取历史数据，避免浮点/整数两次试探查询。
+    :param zapi: 登录后的 Zabbix API 对象
+    :param items: item.get 返回的监控项列表（需包含 itemid 和 value_type）
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :return: {itemid: [按 clock 升序排列的历史记录]}
+    """
+    by_type = {}
+    for item in items:
+        by_type.setdefault(int(item.get("value_type", HISTORY_FLOAT)), []).append(item["itemid"])
+
+    result = {}
+    for history, itemids in by_type.items():
+        result.update(fetch_history(zapi, itemids, time_from, time_till, history=history, **kwargs))
+    return result
+
+
+# fetch_last_values 在结束时间前批量回查的时间长度（秒）
+DEFAULT_LAST_VALUE_TAIL_SECONDS = 86400
+
+
+def fetch_last_values(zapi, items, time_from, time_till, tail_seconds=DEFAULT_LAST_VALUE_TAIL_SECONDS, max_retries=3):
+    """
+    查询每个监控项在时间范围内的最后一个值，按代价从低到高逐步查询：
+    1. 一次 item.get 读取 lastvalue / lastclock，lastclock 落在范围内即为范围内的最后一个值；
+    2. 其余监控项用批量 history.get 查询范围末尾 tail_seconds 秒内的数据，取每个监控项的最后一条；
+    3. 仍未找到的监控项逐个 history.get（按 clock 倒序、limit=1）查询整个范围；
+    4. 范围内的历史数据已过期时使用 lastvalue。
+    :param zapi: 登录后的 Zabbix API 对象
+    :param items: item.get 返回的监控项列表（需包含 itemid 和 value_type）
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :param tail_seconds: 批量回查的时间长度（秒）
+    :return: {itemid: 数值字符串}
+    """
+    items = {str(item["itemid"]): dict(item, itemid=str(item["itemid"])) for item in items}
+    latest = {}
+    for chunk in chunks(list(items), DEFAULT_MAX_ITEMS_PER_REQUEST):
+        for item in _api_get(zapi.item.get, max_retries, itemids=chunk, output=["itemid", "lastvalue", "lastclock"]):
+            latest[item["itemid"]] = item
+
+    values = {}
+    for itemid, item in latest.items():
+        if time_from <= int(item.get("lastclock") or 0) <= time_till:
+            values[itemid] = item.get("lastvalue")
+
+    pending = [item for itemid, item in items.items() if itemid not in values]
+    if pending:
+        tail = fetch_history_for_items(zapi, pending, max(time_from, time_till - tail_seconds + 1), time_till,
+                                       max_retries=max_retries)
+        values.update({itemid: rows[-1]["value"] for itemid, rows in tail.items() if rows})
+
+    def fetch(item):
+        rows = _api_get(zapi.history.get, max_retries,
+                        itemids=item["itemid"],
+                        history=int(item.get("value_type", HISTORY_FLOAT)),
+                        time_from=time_from,
+                        time_till=time_till,
+                        output=["itemid", "clock", "value"],
+                        sortfield="clock",
+                        sortorder="DESC",
+                        limit=1)
+        return item["itemid"], rows[0]["value"] if rows else None
+
+    pending = [item for itemid, item in items.items() if itemid not in values]
+    if pending and time_till - time_from + 1 > tail_seconds:
+        with ThreadPoolExecutor(max_workers=_worker_count(isinstance(zapi, ZabbixClientPool), len(pending))) as executor:
+            values.update((itemid, value) for itemid, value in executor.map(fetch, pending) if value is not None)
+
+    for itemid in items:
+        if itemid not in values and itemid in latest:
+            values[itemid] = latest[itemid].get("lastvalue")
+    return {itemid: value for itemid, value in values.items() if value not in (None, "")}
+
+
+def split_history_by_day(rows, start_date_dt, end_date_dt):
+    """
+    将按 clock 升序排列的历史记录按本地日期拆分。
+    :param rows: 历史记录列表
+    :param start_date_dt: 开始日期
+    :param end_date_dt: 结束日期
+    :return: {"%Y%m%d": [当日历史记录]}
+    """
+    clocks = [int(row["clock"]) for row in rows]
+    days = {}
+    current_date = start_date_dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    while current_date <= end_date_dt:
+        next_date = current_date + timedelta(days=1)
+        lo = bisect_left(clocks, int(current_date.timestamp()))
+        hi = bisect_left(clocks, int(next_date.timestamp()))
+        days[current_date.strftime("%Y%m%d")] = rows[lo:hi]
+        current_date = next_date
+    return days
+
+
+# 超过该天数的报表默认改用 trend.get（小时级 min/avg/max）
+DEFAULT_TREND_SPAN_DAYS = 7
+DEFAULT_TREND_CHUNK_SECONDS = 30 * 86400
+
+_PERIOD_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_zabbix_period(value):
+    """
+    解析 Zabbix 的时间长度字符串（如 "90d"、"1w"、"3600"），无法解析（如宏）时返回 None
+    """
+    value = str(value or "").strip()
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    number, unit = value[:-1], value[-1]
+    if number.isdigit() and unit in _PERIOD_UNITS:
+        return int(number) * _PERIOD_UNITS[unit]
+    return None
+
+
+def should_use_trends(items, time_from, time_till, trend_span_days=DEFAULT_TREND_SPAN_DAYS, now=None):
+    """
+    判断是否改用 trend.get：查询跨度超过 trend_span_days，或开始时间早于监控项的历史保留期。
+    :param items: item.get 返回的监控项列表（可包含 history 字段）
+    :param time_from: 开始时间戳
+    :param time_till: 结束时间戳
+    :param trend_span_days: 触发趋势查询的跨度（天）
+    :param now: 当前时间戳（默认取系统时间）
+    :return: True 表示使用趋势数据
+    """
+    if trend_span_days is not None and time_till - time_from > trend_span_days * 86400:
+        return True
+    now = now or time.time()
+    for item in items:
+        retention = parse_zabbix_period(item.get("history"))
+        if retention is not None and now - time_from > retention:
+            return True
+    return False
+
+
+def fetch_trends(zapi, itemids, time_from, time_till,
+                 max_items_per_request=DEFAULT_MAX_ITEMS_PER_REQUEST,
+                 chunk_seconds=DEFAULT_TREND_CHUNK_SECONDS,
+                 max_rows=DEFAULT_MAX_ROWS_PER_REQUEST,
+                 max_retries=3):
+    """
+    批量拉取多个监控项的小时级趋势数据，切分规则与 fetch_history 相同。
+    :param zapi: 登录后的 Zabbix API 对象
+    :param itemids: 监控项ID列表
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :return: {itemid: [按 clock 升序排列的趋势记录（含 value_min/value_avg/value_max）]}
+    """
+    result, requests_sent = _fetch_chunked(_trend_request(zapi), itemids, time_from, time_till,
+                                           max_items_per_request, chunk_seconds, max_rows, max_retries,
+                                           concurrent=isinstance(zapi, ZabbixClientPool))
+    if requests_sent:
+        logging.info(f"trend.get 共请求 {requests_sent} 次，监控项 {len(result)} 个，记录 {sum(len(r) for r in result.values())} 条")
+    return result
+
+
+def trend_peak_windows(trend_rows, start_date_dt, end_date_dt, pad_seconds):
+    """
+    根据趋势数据为每天挑选候选峰值小时（小时均值最高），并向前后扩展 pad_seconds。
+    :param trend_rows: 单个监控项按 clock 升序排列的趋势记录
+    :param start_date_dt: 开始日期
+    :param end_date_dt: 结束日期
+    :param pad_seconds: 候选小时前后扩展的秒数
+    :return: {"%Y%m%d": (time_from, time_till)}，窗口不超出当天范围
+    """
+    windows = {}
+    for day_str, rows in split_history_by_day(trend_rows, start_date_dt, end_date_dt).items():
+        if not rows:
+            continue
+        peak = max(rows, key=lambda row: float(row["value_avg"]))
+        day_start = int(datetime.strptime(day_str, "%Y%m%d").timestamp())
+        day_end = int((datetime.strptime(day_str, "%Y%m%d") + timedelta(days=1)).timestamp()) - 1
+        windows[day_str] = (max(day_start, int(peak["clock"]) - pad_seconds),
+                            min(day_end, int(peak["clock"]) + 3600 + pad_seconds))
+    return windows
+
+
+def fetch_history_around_trend_peaks(zapi, items, time_from, time_till, start_date_dt, end_date_dt, pad_seconds, **kwargs):
+    """
+    趋势快速路径：先用 trend.get 定位每天的候选峰值小时，再只拉取这些小时前后的原始历史数据。
+    候选窗口相同的监控项合并为一次 history.get；历史数据已过期时退化为当天各小时的最大值（value_max）。
+    :param zapi: 登录后的 Zabbix API 对象
+    :param items: item.get 返回的监控项列表（需包含 itemid 和 value_type）
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :param start_date_dt: 开始日期
+    :param end_date_dt: 结束日期
+    :param pad_seconds: 候选小时前后扩展的秒数
+    :return: ({itemid: [按 clock 升序排列的历史记录]}, {itemid: 退化为趋势数据的日期集合})
+    """
+    trends = fetch_trends(zapi, [item["itemid"] for item in items], time_from, time_till)
+
+    # 按 (数据类型, 时间窗口) 分组，同一窗口的监控项一次查询
+    groups = {}
+    for item in items:
+        windows = trend_peak_windows(trends.get(item["itemid"], []), start_date_dt, end_date_dt, pad_seconds)
+        for day_str, window in windows.items():
+            groups.setdefault((int(item.get("value_type", HISTORY_FLOAT)), window), []).append((item["itemid"], day_str))
+
+    result = {item["itemid"]: [] for item in items}
+    trend_days = {}
+    for (history, (window_from, window_till)), targets in groups.items():
+        fetched = fetch_history(zapi, [itemid for itemid, _ in targets], window_from, window_till, history=history, **kwargs)
+        for itemid, day_str in targets:
+            rows = fetched.get(itemid, [])
+            if not rows:
+                # 该日原始数据已过期，退化为当天的小时最大值（小时均值会掩盖真实峰值）
+                day_trends = split_history_by_day(trends[itemid], start_date_dt, end_date_dt).get(day_str, [])
+                rows = [{"itemid": itemid, "clock": row["clock"], "value": row["value_max"]} for row in day_trends]
+                trend_days.setdefault(itemid, set()).add(day_str)
+            result[itemid].extend(rows)
+
+    for rows in result.values():
+        rows.sort(key=lambda row: int(row["clock"]))
+    return result, trend_days
+
+
+def daily_max_from_trends(trend_rows):
+    """
+    由小时级趋势数据计算每日最大值（value_max 为小时内真实最大值，结果与原始数据一致）
+    :param trend_rows: 单个监控项的趋势记录
+    :return: {"%Y%m%d": 当日最大值}
+    """
+    daily = {}
+    for row in trend_rows:
+        day_str = datetime.fromtimestamp(int(row["clock"])).strftime("%Y%m%d")
+        value = float(row["value_max"])
+        if day_str not in daily or value > daily[day_str]:
+            daily[day_str] = value
+    return daily
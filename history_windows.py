@@ -0,0 +1,49 @@
+# history.get / trend.get 请求的切分规则，同步（history_fetch）和异步（async_zabbix_api）客户端共用
+
+# history.get 的 history 参数取值
+HISTORY_FLOAT = 0
+HISTORY_UINT = 3
+
+# 默认批量参数：单次请求的监控项数、时间分片长度（秒）以及单次响应的最大行数
+DEFAULT_MAX_ITEMS_PER_REQUEST = 200
+DEFAULT_CHUNK_SECONDS = 86400
+DEFAULT_MAX_ROWS_PER_REQUEST = 200000
+
+
+def chunks(values, size):
+    """按固定大小切分列表"""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def plan_windows(itemids, time_from, time_till, max_items_per_request, chunk_seconds):
+    """
+    按监控项数量和时间分片切分查询
+    :param itemids: 去重后的监控项ID列表
+    :param time_from: 开始时间戳（包含）
+    :param time_till: 结束时间戳（包含）
+    :return: [(监控项ID列表, 开始时间戳（包含）, 结束时间戳（不包含）)]
+    """
+    stop_all = int(time_till) + 1
+    windows = []
+    for item_chunk in chunks(itemids, max_items_per_request):
+        start = int(time_from)
+        while start < stop_all:
+            stop = min(start + chunk_seconds, stop_all)
+            windows.append((item_chunk, start, stop))
+            start = stop
+    return windows
+
+
+def split_window(itemids, start, stop):
+    """
+    响应被截断时拆分查询：先按监控项二分，单个监控项再按时间二分
+    :return: 两个 (监控项ID列表, 开始时间戳, 结束时间戳)，无法再拆分时返回 None
+    """
+    if len(itemids) > 1:
+        mid = len(itemids) // 2
+        return [(itemids[:mid], start, stop), (itemids[mid:], start, stop)]
+    if stop - start > 1:
+        mid = start + (stop - start) // 2
+        return [(itemids, start, mid), (itemids, mid, stop)]
+    return None
@@ -0,0 +1,247 @@
+import time
+import sqlite3
+import logging
+import threading
+
+# 默认缓存文件和有效期（秒）
+DEFAULT_CACHE_FILE = "zabbix_inventory.db"
+DEFAULT_CACHE_TTL = 86400
+DEFAULT_CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS hosts (
+    hostid TEXT PRIMARY KEY,
+    host TEXT,
+    name TEXT,
+    status TEXT,
+    proxy_hostid TEXT,
+    ip TEXT,
+    interface_type TEXT
+);
+CREATE TABLE IF NOT EXISTS host_templates (
+    hostid TEXT,
+    templateid TEXT,
+    template_name TEXT,
+    PRIMARY KEY (hostid, templateid)
+);
+CREATE TABLE IF NOT EXISTS items (
+    itemid TEXT PRIMARY KEY,
+    hostid TEXT,
+    name TEXT,
+    key_ TEXT,
+    value_type TEXT,
+    history TEXT
+);
+CREATE TABLE IF NOT EXISTS item_queries (
+    hostid TEXT,
+    key_search TEXT,
+    refreshed_at REAL,
+    PRIMARY KEY (hostid, key_search)
+);
+CREATE INDEX IF NOT EXISTS idx_items_key ON items (key_);
+CREATE INDEX IF NOT EXISTS idx_items_hostid ON items (hostid);
+"""
+
+
+def _chunks(values, size):
+    """按固定大小切分列表"""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _like_pattern(value):
+    """转换为 LIKE 模糊匹配（与 Zabbix 的 search 一致），转义 % 和 _"""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _placeholders(values):
+    return ",".join("?" * len(values))
+
+
+def _main_interface(host):
+    """取第一个配置了 IP 的接口，返回 (IP, 接口类型)"""
+    for interface in host.get("interfaces", []):
+        if interface.get("ip", "").strip():
+            return interface["ip"], interface.get("type")
+    return None, None
+
+
+class InventoryCache:
+    """
+    本地 SQLite 库存缓存：缓存主机、模板关联和监控项，供峰值报表在本地查询。
+
+    主机列表每次刷新只查询一次主机ID，与缓存比对后仅拉取新增主机的详细信息并删除已移除的主机；
+    超过有效期（ttl）后重新拉取全部主机详细信息并更新有变化的主机。已有主机的状态、模板和IP变化在有效期内不会更新，
+    峰值报表按这几项筛选主机，ttl 应短于允许的数据滞后时间。监控项按主机记录刷新时间，过期后才重新查询。
+    """
+
+    def __init__(self, zapi, db_path=DEFAULT_CACHE_FILE, ttl=DEFAULT_CACHE_TTL, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        :param zapi: 登录后的 Zabbix API 对象
+        :param db_path: SQLite 缓存文件路径
+        :param ttl: 缓存有效期（秒），默认为一天（主机状态、模板和IP最多滞后这么久）
+        :param chunk_size: 单次 API 请求的对象数量
+        """
+        self.zapi = zapi
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _is_fresh(self, refreshed_at):
+        return refreshed_at is not None and time.time() - float(refreshed_at) < self.ttl
+
+    def _delete_hosts(self, hostids):
+        for chunk in _chunks(list(hostids), self.chunk_size):
+            marks = _placeholders(chunk)
+            for table in ("hosts", "host_templates", "items", "item_queries"):
+                self.conn.execute(f"DELETE FROM {table} WHERE hostid IN ({marks})", chunk)
+
+    def _host_state(self, hostids):
+        """缓存中主机的可比较状态 {hostid: (名称, 可见名称, 状态, 代理, IP, 接口类型, 模板ID集合)}"""
+        state = {}
+        for chunk in _chunks(list(hostids), self.chunk_size):
+            marks = _placeholders(chunk)
+            templates = {}
+            for row in self.conn.execute(f"SELECT hostid, templateid FROM host_templates WHERE hostid IN ({marks})", chunk):
+                templates.setdefault(row["hostid"], set()).add(row["templateid"])
+            for row in self.conn.execute(f"SELECT * FROM hosts WHERE hostid IN ({marks})", chunk):
+                state[row["hostid"]] = (row["host"], row["name"], row["status"], row["proxy_hostid"], row["ip"],
+                                        row["interface_type"], frozenset(templates.get(row["hostid"], ())))
+        return state
+
+    def refresh_hosts(self, force=False):
+        """
+        增量刷新主机列表。
+        有效期内只查询一次主机ID，拉取新增主机的详细信息并删除已移除的主机；
+        超过有效期后按主机ID分块重新拉取全部主机详细信息，只写入有变化的主机。
+        :param force: 是否忽略有效期，重新拉取所有主机详细信息
+        :return: 本次新增或更新的主机数量
+        """
+        with self._lock:
+            server_ids = {host["hostid"] for host in self.zapi.host.get(output=["hostid"])}
+            cached_ids = {row["hostid"] for row in self.conn.execute("SELECT hostid FROM hosts")}
+
+            removed = cached_ids - server_ids
+            if removed:
+                self._delete_hosts(removed)
+
+            full_refresh = force or not self._is_fresh(self._get_meta("hosts_refreshed_at"))
+            to_fetch = sorted(server_ids if full_refresh else server_ids - cached_ids, key=int)
+            changed = 0
+            for chunk in _chunks(to_fetch, self.chunk_size):
+                hosts = self.zapi.host.get(
+                    hostids=chunk,
+                    output=["hostid", "host", "name", "status", "proxy_hostid"],
+                    selectInterfaces=["ip", "type"],
+                    selectParentTemplates=["templateid", "name"]
+                )
+                cached_state = self._host_state(chunk) if full_refresh else {}
+                for host in hosts:
+                    ip, interface_type = _main_interface(host)
+                    templates = host.get("parentTemplates", [])
+                    state = (host.get("host"), host.get("name"), host.get("status"), host.get("proxy_hostid"), ip,
+                             interface_type, frozenset(t["templateid"] for t in templates))
+                    if cached_state.get(host["hostid"]) == state:
+                        continue
+                    changed += 1
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO hosts (hostid, host, name, status, proxy_hostid, ip, interface_type) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (host["hostid"], host.get("host"), host.get("name"), host.get("status"),
+                         host.get("proxy_hostid"), ip, interface_type)
+                    )
+                    self.conn.execute("DELETE FROM host_templates WHERE hostid = ?", (host["hostid"],))
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO host_templates (hostid, templateid, template_name) VALUES (?, ?, ?)",
+                        [(host["hostid"], t["templateid"], t["name"]) for t in templates]
+                    )
+
+            if full_refresh:
+                self._set_meta("hosts_refreshed_at", time.time())
+            self.conn.commit()
+            logging.info(f"主机缓存刷新完成：新增/更新 {changed} 台，删除 {len(removed)} 台，共 {len(server_ids)} 台")
+            return changed
+
+    def get_hosts(self, status=None):
+        """
+        查询缓存中的主机，附带 parentTemplates（格式与 host.get 一致）。
+        :param status: 主机状态（"0" 启用，"1" 禁用，可选）
+        :return: 主机列表
+        """
+        sql = "SELECT * FROM hosts" + (" WHERE status = ?" if status is not None else "")
+        hosts = [dict(row) for row in self.conn.execute(sql, (status,) if status is not None else ())]
+        templates = {}
+        for row in self.conn.execute("SELECT hostid, templateid, template_name FROM host_templates"):
+            templates.setdefault(row["hostid"], []).append({"templateid": row["templateid"], "name": row["template_name"]})
+        for host in hosts:
+            host["parentTemplates"] = templates.get(host["hostid"], [])
+        return hosts
+
+    def get_items(self, hostids, key_search):
+        """
+        查询主机上键名包含 key_search 的监控项，过期或未缓存的主机才调用 item.get。
+        :param hostids: 主机ID列表
+        :param key_search: 监控项键名（模糊匹配）
+        :return: 监控项列表（itemid、hostid、name、key_、value_type、history）
+        """
+        hostids = [str(hostid) for hostid in hostids]
+        pattern = _like_pattern(key_search)
+        with self._lock:
+            refreshed = {}
+            for chunk in _chunks(hostids, self.chunk_size):
+                rows = self.conn.execute(
+                    f"SELECT hostid, refreshed_at FROM item_queries WHERE key_search = ? AND hostid IN ({_placeholders(chunk)})",
+                    [key_search] + chunk
+                )
+                refreshed.update({row["hostid"]: row["refreshed_at"] for row in rows})
+            stale = [hostid for hostid in hostids if not self._is_fresh(refreshed.get(hostid))]
+
+            now = time.time()
+            for chunk in _chunks(stale, self.chunk_size):
+                items = self.zapi.item.get(
+                    hostids=chunk,
+                    search={"key_": key_search},
+                    output=["itemid", "hostid", "name", "key_", "value_type", "history"]
+                )
+                self.conn.execute(
+                    f"DELETE FROM items WHERE key_ LIKE ? ESCAPE '\\' AND hostid IN ({_placeholders(chunk)})",
+                    [pattern] + chunk
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO items (itemid, hostid, name, key_, value_type, history) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(i["itemid"], i["hostid"], i.get("name"), i.get("key_"), i.get("value_type"), i.get("history")) for i in items]
+                )
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO item_queries (hostid, key_search, refreshed_at) VALUES (?, ?, ?)",
+                    [(hostid, key_search, now) for hostid in chunk]
+                )
+            self.conn.commit()
+            if stale:
+                logging.info(f"监控项缓存刷新: {key_search}，{len(stale)} 台主机")
+
+            result = []
+            for chunk in _chunks(hostids, self.chunk_size):
+                rows = self.conn.execute(
+                    f"SELECT * FROM items WHERE key_ LIKE ? ESCAPE '\\' AND hostid IN ({_placeholders(chunk)}) ORDER BY CAST(itemid AS INTEGER)",
+                    [pattern] + chunk
+                )
+                result.extend(dict(row) for row in rows)
+            return result
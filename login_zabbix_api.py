@@ -1,8 +1,14 @@
 import pyzabbix
 import configparser
 import os
+import gzip
+import json
 import logging
-from typing import Optional
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional, Tuple
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -25,14 +31,13 @@ def login_zabbix_server(server_url: str, username: str, password: str) -> Option
         logging.error(f"Failed to login to Zabbix API: {e}")
         return None
 
-def login_zabbix_api(config_file: str = "config.ini", config_section: str = "Zabbix") -> Optional[pyzabbix.ZabbixAPI]:
+def _read_login_config(config_file: str, config_section: str) -> Optional[Tuple[str, str, str]]:
     """
-    从配置文件读取登录参数并登录Zabbix API。
-    :param config_file: 配置文件路径，默认为'config.ini'
-    :param config_section: 配置文件中Zabbix登录信息所在的节名，默认为'Zabbix'
-    :return: 如果登录成功，返回ZabbixAPI实例；否则返回None
+    从配置文件读取登录参数。
+    :param config_file: 配置文件路径
+    :param config_section: 配置文件中Zabbix登录信息所在的节名
+    :return: (ServerURL, Username, Password)，参数不完整时返回None
     """
-    # 从配置文件读取登录参数
     config = configparser.ConfigParser()
     config.read(config_file)
 
@@ -57,4 +62,145 @@ def login_zabbix_api(config_file: str = "config.ini", config_section: str = "Zab
     if "ZABBIX_PASSWORD" not in os.environ:
         logging.warning("使用配置文件中的密码而不是环境变量。建议使用环境变量提高安全性。")
 
-    return login_zabbix_server(zabbix_server, zabbix_username, zabbix_password)
\ No newline at end of file
+    return zabbix_server, zabbix_username, zabbix_password
+
+def login_zabbix_api(config_file: str = "config.ini", config_section: str = "Zabbix") -> Optional[pyzabbix.ZabbixAPI]:
+    """
+    从配置文件读取登录参数并登录Zabbix API。
+    :param config_file: 配置文件路径，默认为'config.ini'
+    :param config_section: 配置文件中Zabbix登录信息所在的节名，默认为'Zabbix'
+    :return: 如果登录成功，返回ZabbixAPI实例；否则返回None
+    """
+    login_config = _read_login_config(config_file, config_section)
+    if login_config is None:
+        return None
+    return login_zabbix_server(*login_config)
+
+class _CompressedSession(requests.Session):
+    """
+    JSON请求体超过阈值时使用gzip压缩的Session，响应默认接受gzip。
+    """
+    def __init__(self, compress_threshold: Optional[int] = None):
+        super().__init__()
+        self.compress_threshold = compress_threshold
+        self.headers["Accept-Encoding"] = "gzip, deflate"
+
+    def request(self, method, url, **kwargs):
+        payload = kwargs.get("json")
+        if payload is not None and self.compress_threshold is not None:
+            body = json.dumps(payload).encode("utf-8")
+            if len(body) >= self.compress_threshold:
+                kwargs.pop("json")
+                kwargs["data"] = gzip.compress(body)
+                kwargs["headers"] = dict(kwargs.get("headers") or {}, **{"Content-Encoding": "gzip"})
+        return super().request(method, url, **kwargs)
+
+class ZabbixClientPool:
+    """
+    线程安全的Zabbix API客户端池。
+
+    只登录一次，所有线程共享同一个认证令牌和同一个HTTP连接池（keep-alive），
+    每个线程持有独立的ZabbixAPI和Session，互不干扰。
+    可直接当作ZabbixAPI使用（如 pool.host.get(...)），调用会自动路由到当前线程的实例。
+    """
+
+    def __init__(self, server_url: str, username: str, password: str, pool_size: int = 10,
+                 timeout: Optional[float] = 30, compress_threshold: Optional[int] = None):
+        """
+        :param server_url: Zabbix服务器URL
+        :param username: Zabbix用户名
+        :param password: Zabbix密码
+        :param pool_size: HTTP连接池大小，建议不小于并发线程数
+        :param timeout: 单次请求超时时间（秒）
+        :param compress_threshold: 请求体超过该字节数时使用gzip压缩，默认为None（不压缩，需前端支持）
+        """
+        self.server_url = server_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.compress_threshold = compress_threshold
+        # urllib3连接池本身是线程安全的，所有线程的Session共享同一个适配器
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+        zapi = self._new_client()
+        zapi.login(username, password)
+        self.auth = zapi.auth
+        self.version = zapi.version
+        self._local.zapi = zapi
+
+    def _new_client(self) -> pyzabbix.ZabbixAPI:
+        session = _CompressedSession(self.compress_threshold)
+        session.mount("http://", self._adapter)
+        session.mount("https://", self._adapter)
+        return pyzabbix.ZabbixAPI(self.server_url, session=session, timeout=self.timeout)
+
+    def get(self) -> pyzabbix.ZabbixAPI:
+        """
+        获取当前线程专属的ZabbixAPI实例（共享认证令牌和连接池）。
+        """
+        zapi = getattr(self._local, "zapi", None)
+        if zapi is None:
+            zapi = self._new_client()
+            zapi.auth = self.auth
+            zapi.version = self.version
+            self._local.zapi = zapi
+        return zapi
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+def login_zabbix_pool(config_file: str = "config.ini", config_section: str = "Zabbix", pool_size: int = 10,
+                      timeout: Optional[float] = 30, compress_threshold: Optional[int] = None) -> Optional[ZabbixClientPool]:
+    """
+    从配置文件读取登录参数并创建线程安全的Zabbix API客户端池。
+    :param config_file: 配置文件路径，默认为'config.ini'
+    :param config_section: 配置文件中Zabbix登录信息所在的节名，默认为'Zabbix'
+    :param pool_size: HTTP连接池大小，默认为10
+    :param timeout: 单次请求超时时间（秒），默认为30
+    :param compress_threshold: 请求体超过该字节数时使用gzip压缩，默认为None（不压缩）
+    :return: 如果登录成功，返回ZabbixClientPool实例；否则返回None
+    """
+    login_config = _read_login_config(config_file, config_section)
+    if login_config is None:
+        return None
+    try:
+        pool = ZabbixClientPool(*login_config, pool_size=pool_size, timeout=timeout, compress_threshold=compress_threshold)
+        logging.info(f"成功登录Zabbix API！连接池大小: {pool_size}")
+        return pool
+    except (pyzabbix.ZabbixAPIException, requests.RequestException) as e:
+        logging.error(f"Failed to login to Zabbix API: {e}")
+        return None
+
+# 进程级的会话缓存：{(配置文件, 节名): (客户端池, 过期时间)}
+DEFAULT_SESSION_TTL = 1800
+_session_cache = {}
+_session_cache_lock = threading.Lock()
+
+def get_shared_zabbix_api(config_file: str = "config.ini", config_section: str = "Zabbix",
+                          ttl: int = DEFAULT_SESSION_TTL) -> Optional[ZabbixClientPool]:
+    """
+    获取进程内共享的Zabbix API会话，在有效期内复用同一认证令牌，过期后自动重新登录。
+    :param config_file: 配置文件路径，默认为'config.ini'
+    :param config_section: 配置文件中Zabbix登录信息所在的节名，默认为'Zabbix'
+    :param ttl: 会话有效期（秒），默认为1800
+    :return: 如果登录成功，返回ZabbixClientPool实例；否则返回None
+    """
+    key = (os.path.abspath(config_file), config_section)
+    with _session_cache_lock:
+        cached = _session_cache.get(key)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        zapi = login_zabbix_pool(config_file, config_section)
+        if zapi is not None:
+            _session_cache[key] = (zapi, time.monotonic() + ttl)
+        return zapi
+
+def clear_shared_zabbix_api() -> None:
+    """
+    清空共享会话缓存，下次调用 get_shared_zabbix_api 时重新登录。
+    """
+    with _session_cache_lock:
+        _session_cache.clear()
@@ -0,0 +1,618 @@
+import os
+import re
+import logging
+from datetime import datetime, timedelta
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+from despike import smooth_spikes_array
+from login_zabbix_api import login_zabbix_pool
+from inventory_cache import InventoryCache, DEFAULT_CACHE_TTL
+from adaptive_concurrency import get_shared_limiter
+from history_fetch import (HISTORY_FLOAT, HISTORY_UINT, DEFAULT_TREND_SPAN_DAYS, fetch_history_for_items, fetch_trends,
+                           should_use_trends, fetch_history_around_trend_peaks, fetch_last_values)
+from history_columns import empty_columns, decode_history_by_item, split_columns_by_day, to_local_datetime_index
+from report_sink import open_sink
+
+LINUX_BASELINE = "Envision_Temp_ZBX_Linux_Baseline"
+WINDOWS_BASELINE = "Envision_Temp_ZBX_Windows_Baseline"
+WINDOWS_BASELINE_ACTIVE = "Envision_Temp_ZBX_Windows_Baseline_active"
+
+# 指标定义
+#   label: 指标名称（用于日志和工作表名）
+#   templates: 系统类型 -> 模板列表，按顺序匹配，决定主机是否参与统计及其系统类型
+#   analysis: "window" 平滑 + 1分钟重采样 + 滑动窗口峰值；"daily_max" 每个实例的每日最大值
+#   value_type: 监控项未返回 value_type 时使用的历史数据类型
+# window 类指标：
+#   key_variants: 系统类型 -> 候选 key（按优先级排列），item_name: 监控项名称
+# daily_max 类指标：
+#   key_search: item.get 的 key 模糊搜索条件
+#   key_pattern: 解析 key 的正则，分组为 (实例, 类型)；类型为 value_kind 的是统计值，total_kind 的是容量
+#   total_scale: 容量换算系数（容量取时间范围内的最后一个值），columns: 实例/峰值/容量的列名
+#   utc_days: 按 UTC 日期统计每日最大值
+METRIC_SPECS = {
+    "cpu": {
+        "label": "CPU",
+        "templates": {"Linux": [LINUX_BASELINE], "Windows": [WINDOWS_BASELINE]},
+        "host_status": "0",
+        "template_match": "exact",
+        "analysis": "window",
+        "value_type": HISTORY_FLOAT,
+        "key_variants": {
+            "Linux": ["system.cpu.util"],
+            "Windows": [r"perf_counter[\Processor(_Total)\% Processor Time]"]
+        },
+        "item_name": "CPU utilization",
+    },
+    "memory": {
+        "label": "内存",
+        "templates": {"Linux": [LINUX_BASELINE], "Windows": [WINDOWS_BASELINE]},
+        "host_status": "0",
+        "template_match": "exact",
+        "analysis": "window",
+        "value_type": HISTORY_FLOAT,
+        "key_variants": {
+            "Linux": ["vm.memory.utilization"],
+            "Windows": [r"vm.memory.size[pused]"]
+        },
+        "item_name": "Memory utilization",
+    },
+    "disk": {
+        "label": "磁盘",
+        "templates": {"Windows": [WINDOWS_BASELINE, WINDOWS_BASELINE_ACTIVE], "Linux": [LINUX_BASELINE]},
+        # 与原磁盘报表（search_hosts_by_template）一致：包含禁用的主机，模板名称模糊匹配
+        "host_status": None,
+        "template_match": "search",
+        "analysis": "daily_max",
+        "value_type": HISTORY_FLOAT,
+        "key_search": "vfs.fs.size",
+        "key_pattern": r'vfs\.fs\.size\[(.*?),(pused|total)\]',
+        "value_kind": "pused",
+        "total_kind": "total",
+        "total_value_type": HISTORY_UINT,
+        "total_scale": 1024 ** 3,  # 转换为 GB
+        # 与原磁盘报表（pd.to_datetime(clock, unit='s')）一致，日期列按 UTC 划分
+        "utc_days": True,
+        "columns": {"instance": "目录名称", "value": "磁盘使用率峰值(%)", "total": "目录磁盘大小(GB)"},
+    },
+}
+
+# 分析进程数（None 为 CPU 核数）、每批拉取数据的主机数量以及最多同时等待分析的批次数
+DEFAULT_ANALYSIS_WORKERS = None
+DEFAULT_HOST_BATCH_SIZE = 200
+DEFAULT_MAX_PENDING_BATCHES = 2
+
+WINDOW_COLUMNS = ['IP地址', '系统类型', '日期', '峰值时间', '峰值利用率(%)',
+                  '窗口总负荷', '峰值窗口开始时间', '峰值窗口结束时间', '数据点数', '窗口大小(分钟)', '数据质量', '数据来源']
+# 窗口分析报表各列的类型（Parquet 输出）
+WINDOW_DTYPES = {
+    'IP地址': 'str', '系统类型': 'category', '日期': 'date', '峰值时间': 'datetime', '峰值利用率(%)': 'float',
+    '窗口总负荷': 'float', '峰值窗口开始时间': 'datetime', '峰值窗口结束时间': 'datetime', '数据点数': 'int',
+    '窗口大小(分钟)': 'int', '数据质量': 'category', '数据来源': 'category'
+}
+# 执行摘要的值类型各不相同，统一保存为字符串
+SUMMARY_DTYPES = {'参数': 'str', '值': 'str'}
+
+
+def sliding_window_sum(series, window_size=30):
+    """
+    滑动窗口计算窗口内使用率总和
+    参数：
+        series: pd.Series 时间序列数据
+        window_size: 窗口大小（分钟）
+    返回：
+        窗口内使用率总和的Series
+    """
+    window_sum = series.rolling(window=f'{window_size}min', min_periods=1).sum()
+    return window_sum
+
+
+# 窗口分析每日结果的数据来源：整天的历史数据、趋势定位的峰值小时前后的历史数据、历史数据过期时的小时最大值
+SOURCE_HISTORY = "历史数据"
+SOURCE_PEAK_WINDOW = "峰值窗口"
+SOURCE_TREND = "趋势数据"
+
+
+def data_quality(points):
+    """按重采样后的数据点数评估数据质量：不超过100为低，不超过200为中，其余为高"""
+    if points <= 100:
+        return '低'
+    return '中' if points <= 200 else '高'
+
+
+def report_columns(spec):
+    """指标报表的列名"""
+    if spec["analysis"] == "window":
+        return WINDOW_COLUMNS
+    columns = spec["columns"]
+    return ['IP地址', '日期', columns["instance"], columns["value"], columns["total"]]
+
+
+def report_dtypes(spec):
+    """指标报表各列的类型（用于 Parquet 输出，写法见 report_sink.arrow_type）"""
+    if spec["analysis"] == "window":
+        return WINDOW_DTYPES
+    columns = spec["columns"]
+    return {'IP地址': 'str', '日期': 'date', columns["instance"]: 'str', columns["value"]: 'float', columns["total"]: 'float'}
+
+
+def _chunks(values, size):
+    """按固定大小切分列表"""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def get_report_hosts(zapi, cache=None, status="0"):
+    """
+    获取主机及其关联模板
+    :param zapi: 登录后的 Zabbix API 对象
+    :param cache: InventoryCache 本地库存缓存（可选，提供时从缓存查询）
+    :param status: 主机状态（"0" 启用，"1" 禁用），None 表示所有主机
+    :return: 主机列表（含 hostid、host、status、ip、parentTemplates）
+    """
+    if cache is not None:
+        # 从本地缓存查询主机，只增量拉取新增主机
+        cache.refresh_hosts()
+        return cache.get_hosts(status=status)
+
+    params = {"filter": {"status": status}} if status is not None else {}
+    hosts = zapi.host.get(
+        output=["hostid", "host", "status"],
+        selectParentTemplates=["templateid", "name"],
+        selectInterfaces=["ip"],
+        **params
+    )
+    for host in hosts:
+        host['ip'] = next((i['ip'] for i in host.get('interfaces', []) if i.get('ip', '').strip()), None)
+    return hosts
+
+
+def classify_host(host, spec):
+    """
+    按指标定义的主机状态和模板判断主机的系统类型，不符合条件时返回 None。
+    template_match 为 "search" 时模板名称按不区分大小写的包含关系匹配（与 template.get 的 search 一致）
+    """
+    if spec.get("host_status") is not None and host.get("status") != spec["host_status"]:
+        return None
+    templates = [t['name'] for t in host.get('parentTemplates', [])]
+    for system_type, names in spec["templates"].items():
+        if spec.get("template_match") == "search":
+            if any(name.lower() in template.lower() for name in names for template in templates):
+                return system_type
+        elif any(name in templates for name in names):
+            return system_type
+    return None
+
+
+def resolve_window_items(zapi, hosts, spec, cache=None):
+    """
+    批量查询主机的监控项，每个key只发送一次 item.get
+    :param hosts: 主机信息列表（需包含 system_type）
+    :return: {hostid: 监控项信息}
+    """
+    host_items = {}
+    for system_type, key_variants in spec["key_variants"].items():
+        for key in key_variants:
+            hostids = [h['hostid'] for h in hosts
+                       if h['system_type'] == system_type and h['hostid'] not in host_items]
+            if not hostids:
+                break
+            try:
+                if cache is not None:
+                    items = [item for item in cache.get_items(hostids, key) if item['name'] == spec["item_name"]]
+                else:
+                    items = zapi.item.get(
+                        output=["itemid", "hostid", "name", "key_", "value_type", "history"],
+                        hostids=hostids,
+                        search={"key_": key},
+                        filter={"name": spec["item_name"]}
+                    )
+                for item in items:
+                    host_items.setdefault(item['hostid'], item)
+            except Exception as e:
+                logging.error(f"{spec['label']}监控项查询异常: {e}")
+
+    for host in hosts:
+        if host['hostid'] not in host_items:
+            logging.warning(f"未找到{spec['label']}监控项: {host['host']}，尝试过的key: {spec['key_variants'][host['system_type']]}")
+    return host_items
+
+
+def resolve_instance_items(zapi, hosts, spec, cache=None, chunk_size=500):
+    """
+    按主机分块批量查询 daily_max 类指标的监控项，并按 key_pattern 解析出实例
+    :return: {hostid: {实例: {"value": 监控项, "total": 监控项}}}
+    """
+    hostids = [h['hostid'] for h in hosts]
+    if cache is not None:
+        items = cache.get_items(hostids, spec["key_search"])
+    else:
+        items = []
+        for chunk in _chunks(hostids, chunk_size):
+            try:
+                items.extend(zapi.item.get(
+                    hostids=chunk,
+                    search={"key_": spec["key_search"]},
+                    output=["itemid", "hostid", "key_", "name", "value_type", "history"]
+                ))
+            except Exception as e:
+                logging.error(f"{spec['label']}监控项查询异常: {e}")
+
+    kinds = {spec["value_kind"]: "value", spec["total_kind"]: "total"}
+    host_items = {}
+    for item in items:
+        match = re.match(spec["key_pattern"], item['key_'])
+        if match and match.group(2) in kinds:
+            instance = host_items.setdefault(item['hostid'], {}).setdefault(match.group(1), {})
+            instance[kinds[match.group(2)]] = item
+    return host_items
+
+
+def analyze_window(host, columns, start_date_dt, end_date_dt, window_size, threshold, use_trends=False,
+                   trend_days=frozenset()):
+    """
+    平滑 + 重采样 + 滑动窗口峰值分析
+    参数：
+        host: 主机信息
+        columns: 该主机监控项在整个日期范围内的 (clock 数组, 数值数组)，按clock升序
+        start_date_dt: 开始日期
+        end_date_dt: 结束日期
+        window_size: 窗口大小
+        threshold: 异常阈值
+        use_trends: 数据是否来自趋势快速路径（只包含候选峰值小时前后的数据）
+        trend_days: 历史数据已过期、数值为小时最大值的日期集合
+    返回：
+        每日峰值数据列表
+    """
+    ip_address = host['host']
+    system_type = host['system_type']
+    logging.debug(f"正在处理主机: {ip_address} ({system_type})")
+
+    all_data = []
+    for day_str, (clocks, values) in split_columns_by_day(*columns, start_date_dt, end_date_dt).items():
+        if clocks.size == 0:
+            logging.debug(f"{ip_address} {day_str} 无历史数据")
+            continue
+        if not use_trends:
+            source = SOURCE_HISTORY
+        else:
+            source = SOURCE_TREND if day_str in trend_days else SOURCE_PEAK_WINDOW
+        try:
+            # 小时最大值不是原始采样，不做尖峰平滑
+            if source != SOURCE_TREND:
+                values = smooth_spikes_array(values, window_size=5, threshold=threshold)
+            series = pd.Series(values, index=to_local_datetime_index(clocks))
+
+            resampled = series.resample('1min').mean().ffill()
+
+            window_sum = sliding_window_sum(resampled, window_size=window_size)
+
+            peak_window_sum = window_sum.max()
+            peak_window_idx = window_sum.idxmax()
+            peak_window_start = peak_window_idx - timedelta(minutes=window_size)
+            peak_window_end = peak_window_idx + timedelta(minutes=window_size)
+
+            peak_value = resampled.loc[peak_window_start:peak_window_end].max()
+            peak_time = resampled.index[resampled.to_numpy() == peak_value][0]
+
+            all_data.append({
+                'IP地址': ip_address,
+                '系统类型': system_type,
+                '日期': day_str,
+                '峰值时间': peak_time.strftime("%Y-%m-%d %H:%M:%S"),
+                '峰值利用率(%)': round(peak_value, 2),
+                '窗口总负荷': round(peak_window_sum, 2),
+                '峰值窗口开始时间': peak_window_start.strftime("%Y-%m-%d %H:%M:%S"),
+                '峰值窗口结束时间': peak_window_end.strftime("%Y-%m-%d %H:%M:%S"),
+                '数据点数': len(resampled),
+                '窗口大小(分钟)': window_size,
+                # 趋势路径的数据被截取到峰值窗口或由小时数据前向填充，点数不反映采样密度
+                '数据质量': data_quality(len(resampled)) if source == SOURCE_HISTORY else "N/A",
+                '数据来源': source
+            })
+        except Exception as e:
+            logging.error(f"{ip_address} {day_str} 数据处理异常: {e}")
+
+    return all_data
+
+
+def analyze_daily_max(host, instances, columns_by_item, totals, start_date_dt, end_date_dt, spec):
+    """
+    每个实例的每日最大值分析
+    :param instances: {实例: {"value": 监控项, "total": 监控项}}
+    :param columns_by_item: {itemid: (clock 数组, 数值数组)}，趋势数据应按 value_max 解析
+    :param totals: {容量监控项ID: 时间范围内的最后一个值}
+    :return: 每日峰值数据列表
+    """
+    columns = spec["columns"]
+    all_data = []
+    for instance, items in instances.items():
+        if "value" not in items:
+            continue
+        total_size = None
+        if "total" in items and items["total"]["itemid"] in totals:
+            total_size = round(float(totals[items["total"]["itemid"]]) / spec["total_scale"], 2)
+
+        clocks, values = columns_by_item.get(items["value"]["itemid"], empty_columns())
+        days = split_columns_by_day(clocks, values, start_date_dt, end_date_dt, utc=spec.get("utc_days", False))
+        for day_str, (day_clocks, day_values) in days.items():
+            if day_values.size == 0:
+                continue
+            all_data.append({
+                "IP地址": host['ip'] or host['host'],
+                "日期": day_str,
+                columns["instance"]: instance,
+                columns["value"]: round(float(day_values.max()), 2),
+                columns["total"]: total_size if total_size else "N/A"
+            })
+    all_data.sort(key=lambda row: (row["日期"], row[columns["instance"]]))
+    return all_data
+
+
+def _task_items(spec, target):
+    """
+    列出一个分析任务需要拉取的监控项（补全 value_type）
+    :param target: window 类为监控项，daily_max 类为 {实例: {"value": 监控项, "total": 监控项}}
+    :return: [(监控项, 类型)]，类型为 "window"、"value"（每日最大值）或 "total"（容量，只取最后一个值）
+    """
+    if spec["analysis"] == "window":
+        return [(dict(target, value_type=target.get('value_type', spec["value_type"])), "window")]
+    items = []
+    for instance in target.values():
+        for kind, item in instance.items():
+            default_type = spec["value_type"] if kind == "value" else spec["total_value_type"]
+            items.append((dict(item, value_type=item.get('value_type', default_type)), kind))
+    return items
+
+
+def _fetch_columns(zapi, window_items, max_items, use_trends, time_from, time_till, start_date_dt, end_date_dt, window_size):
+    """
+    拉取一批监控项的数据并解析为列式数组（daily_max 类的容量监控项不在其中，见 fetch_last_values）
+    :return: (window 类 {itemid: 列}, daily_max 类 {itemid: 列}, window 类 {itemid: 退化为趋势数据的日期集合})；
+             daily_max 类的趋势数据按 value_max 解析
+    """
+    if not use_trends:
+        history_by_item = fetch_history_for_items(zapi, list(window_items.values()) + list(max_items.values()),
+                                                  time_from, time_till)
+        columns = decode_history_by_item(history_by_item)
+        return columns, columns, {}
+
+    history_by_item, trend_days = fetch_history_around_trend_peaks(
+        zapi, list(window_items.values()), time_from, time_till, start_date_dt, end_date_dt,
+        pad_seconds=window_size * 2 * 60
+    ) if window_items else ({}, {})
+    trends_by_item = fetch_trends(zapi, list(max_items), time_from, time_till) if max_items else {}
+    return decode_history_by_item(history_by_item), decode_history_by_item(trends_by_item, "value_max"), trend_days
+
+
+def run_peak_analysis(metrics, start_date, end_date, zapi=None, window_size=30, threshold=80, use_trends=None,
+                      trend_span_days=DEFAULT_TREND_SPAN_DAYS, max_workers=10, cache=None,
+                      cache_file=None, cache_ttl=DEFAULT_CACHE_TTL, analysis_workers=DEFAULT_ANALYSIS_WORKERS,
+                      host_batch_size=DEFAULT_HOST_BATCH_SIZE, max_pending_batches=DEFAULT_MAX_PENDING_BATCHES,
+                      on_rows=None):
+    """
+    一次完成多个指标的峰值分析：主机列表只查询一次，按主机分批拉取所有指标的历史数据，
+    再在同一个进程池中分析。
+    参数:
+        metrics: list 指标名称（METRIC_SPECS 的键）
+        start_date: string 开始日期，格式为"%Y%m%d"
+        end_date: string 结束日期，格式为"%Y%m%d"
+        zapi: 登录后的 Zabbix API 对象，默认为None（自动登录）
+        window_size: int 滑动窗口大小（分钟），默认为30。
+        threshold: int 异常峰值判定阈值，默认为80。
+        use_trends: bool 是否使用趋势数据，默认为None（超过trend_span_days或超出历史保留期时自动启用）。
+        trend_span_days: int 自动启用趋势数据的日期跨度（天），默认为7。
+        max_workers: int 自动登录时的HTTP连接池大小下限，默认为10。
+        cache: InventoryCache 本地库存缓存，默认为None。
+        cache_file: string 本地库存缓存文件路径，未传入cache时使用，默认为None（不使用缓存）。
+        cache_ttl: int 库存缓存有效期（秒），默认为一天。
+        analysis_workers: int 分析进程数，默认为None（CPU核数），0 表示在当前进程内分析。
+        host_batch_size: int 每批拉取数据的主机数量，默认为200。
+        max_pending_batches: int 最多同时等待分析的批次数，默认为2。达到上限时先等待最早的批次分析完成再拉取下一批，
+                             分析慢于拉取时内存中的列式数据不超过这几批。
+        on_rows: callable 流式接收结果的回调 on_rows(指标名称, 数据列表)，按主机顺序调用；
+                 传入时结果不在内存中累积，返回的数据列表为空。
+    返回:
+        ({指标名称: 数据列表}, 执行摘要字典)，失败时返回 (None, None)
+    """
+    specs = {name: METRIC_SPECS[name] for name in metrics}
+
+    if zapi is None:
+        # 每个工作线程使用独立的会话句柄，共享认证令牌和keep-alive连接池
+        zapi = login_zabbix_pool(pool_size=max(max_workers, get_shared_limiter().max_limit))
+        if zapi is None:
+            logging.error("API连接失败")
+            return None, None
+
+    try:
+        start_date_dt = datetime.strptime(start_date, "%Y%m%d").replace(hour=0, minute=0, second=0)
+        end_date_dt = datetime.strptime(end_date, "%Y%m%d").replace(hour=23, minute=59, second=59)
+        logging.info(f"日期范围: {start_date_dt} 至 {end_date_dt}")
+    except ValueError as e:
+        logging.error(f"日期格式错误: {e}")
+        return None, None
+
+    if cache is None and cache_file:
+        cache = InventoryCache(zapi, cache_file, ttl=cache_ttl)
+
+    try:
+        # 各指标要求的主机状态相同时由服务端过滤，否则取全部主机，再按指标筛选
+        statuses = {spec.get("host_status") for spec in specs.values()}
+        hosts = get_report_hosts(zapi, cache, status=statuses.pop() if len(statuses) == 1 else None)
+        logging.info(f"获取到{len(hosts)}台主机")
+    except Exception as e:
+        logging.error(f"主机查询失败: {e}")
+        return None, None
+
+    # 按指标筛选主机并解析监控项
+    targets = {}
+    all_hosts = set()
+    for name, spec in specs.items():
+        spec_hosts = []
+        for host in hosts:
+            system_type = classify_host(host, spec)
+            if system_type:
+                spec_hosts.append(dict(host, system_type=system_type))
+        logging.info(f"{spec['label']}: 符合条件的主机数量 {len(spec_hosts)}")
+        all_hosts.update(h['hostid'] for h in spec_hosts)
+        if spec["analysis"] == "window":
+            targets[name] = (spec_hosts, resolve_window_items(zapi, spec_hosts, spec, cache))
+        else:
+            targets[name] = (spec_hosts, resolve_instance_items(zapi, spec_hosts, spec, cache))
+
+    # 整理每台主机的分析任务，并汇总所有监控项（用于判断是否使用趋势数据）
+    tasks = {}
+    all_items = []
+    for name, (spec_hosts, host_items) in targets.items():
+        for host in spec_hosts:
+            if host['hostid'] in host_items:
+                tasks.setdefault(host['hostid'], []).append((name, host, host_items[host['hostid']]))
+                all_items.extend(item for item, _ in _task_items(specs[name], host_items[host['hostid']]))
+
+    time_from, time_till = int(start_date_dt.timestamp()), int(end_date_dt.timestamp())
+    if use_trends is None:
+        use_trends = should_use_trends(all_items, time_from, time_till, trend_span_days)
+    if use_trends:
+        # 趋势快速路径：window 类只拉取候选峰值小时前后的原始数据，daily_max 类直接使用小时最大值
+        logging.info("使用趋势数据定位候选峰值")
+
+    # 两级流水线：主线程按主机分批拉取数据（请求并发由共享并发控制器决定），
+    # 解析为列式数组后交给进程池分析，进程池分析当前批次时主线程继续拉取下一批
+    if analysis_workers == 0:
+        executor = ThreadPoolExecutor(max_workers=1)
+    else:
+        executor = ProcessPoolExecutor(max_workers=analysis_workers)
+        logging.info(f"分析进程数: {analysis_workers or os.cpu_count()}")
+
+    results = {name: [] for name in specs}
+    counts = Counter()
+    pending = deque()
+
+    def drain(max_batches):
+        # 按提交顺序取出已完成的分析结果，交给回调或累积到结果中；
+        # 未完成的批次超过 max_batches 时阻塞等待最早的批次（背压）
+        while pending and (pending[0][0].done() or pending[-1][2] - pending[0][2] + 1 > max_batches):
+            future, name, _ = pending.popleft()
+            try:
+                rows = future.result()
+            except Exception as e:
+                logging.error(f"处理主机数据异常: {e}")
+                continue
+            counts[name] += len(rows)
+            if on_rows is not None:
+                on_rows(name, rows)
+            else:
+                results[name].extend(rows)
+
+    with executor:
+        hostids = list(tasks)
+        for batch_no, batch_start in enumerate(range(0, len(hostids), host_batch_size)):
+            batch_tasks = [task for hostid in hostids[batch_start:batch_start + host_batch_size] for task in tasks[hostid]]
+            window_items, max_items, total_items = {}, {}, {}
+            for name, host, target in batch_tasks:
+                for item, kind in _task_items(specs[name], target):
+                    {"window": window_items, "value": max_items, "total": total_items}[kind][item['itemid']] = item
+            try:
+                window_columns, max_columns, trend_days = _fetch_columns(zapi, window_items, max_items, use_trends, time_from, time_till,
+                                                                         start_date_dt, end_date_dt, window_size)
+                totals = fetch_last_values(zapi, list(total_items.values()), time_from, time_till) if total_items else {}
+            except Exception as e:
+                logging.error(f"历史数据查询失败: {e}")
+                executor.shutdown(wait=False, cancel_futures=True)
+                return None, None
+
+            for name, host, target in batch_tasks:
+                if specs[name]["analysis"] == "window":
+                    future = executor.submit(analyze_window, host, window_columns.get(target['itemid'], empty_columns()),
+                                             start_date_dt, end_date_dt, window_size, threshold, use_trends,
+                                             trend_days.get(target['itemid'], frozenset()))
+                else:
+                    task_items = [item['itemid'] for item, _ in _task_items(specs[name], target)]
+                    item_columns = {itemid: max_columns[itemid] for itemid in task_items if itemid in max_columns}
+                    item_totals = {itemid: totals[itemid] for itemid in task_items if itemid in totals}
+                    future = executor.submit(analyze_daily_max, host, target, item_columns, item_totals,
+                                             start_date_dt, end_date_dt, specs[name])
+                pending.append((future, name, batch_no))
+            # 列式数据已交给执行器，释放本地引用
+            del window_columns, max_columns
+            drain(max(1, max_pending_batches) - 1)
+            logging.info(f"已拉取 {min(batch_start + host_batch_size, len(hostids))}/{len(hostids)} 台主机的数据")
+        logging.info(f"历史数据拉取完成: {get_shared_limiter().summary()}")
+
+        drain(0)
+
+    summary = {
+        '开始日期': start_date,
+        '结束日期': end_date,
+        '指标': "、".join(spec['label'] for spec in specs.values()),
+        '总主机数': len(all_hosts),
+        '有效数据条目': sum(counts.values()),
+        '窗口大小(分钟)': window_size,
+        '异常阈值': threshold,
+        '数据来源': "趋势数据" if use_trends else "历史数据",
+    }
+    return results, summary
+
+
+def run_peak_report(metrics, start_date, end_date, output_file, file_format=None, excel_engine=None, **kwargs):
+    """
+    执行峰值分析并流式写入报表：分析结果按主机逐批写出，不在内存中保留完整结果，最后写入“执行摘要”。
+    单个指标时数据表为“峰值数据”，多个指标时每个指标一个工作表。
+    :param file_format: "xlsx"、"csv" 或 "parquet"，默认按扩展名判断（CSV 的每个工作表为单独的文件，
+                        Parquet 的 output_file 为目录，每个工作表一个子目录，数据表按日期分为 Hive 风格的
+                        "日期=YYYY-MM-DD" 子目录，读取方式见 report_sink.ParquetSink）
+    :param excel_engine: Excel 引擎（"openpyxl" write-only 模式或 "xlsxwriter" constant_memory 模式），
+                         默认为None（安装了 xlsxwriter 时优先使用）
+    :param kwargs: 其余参数同 run_peak_analysis
+    :return: 成功生成报表时返回 True
+    """
+    sheet_names = {name: '峰值数据' if len(metrics) == 1 else f"{METRIC_SPECS[name]['label']}峰值" for name in metrics}
+    try:
+        sink = open_sink(output_file, file_format, engine=excel_engine, partition_by='日期')
+        for name in metrics:
+            sink.add_sheet(sheet_names[name], report_columns(METRIC_SPECS[name]), report_dtypes(METRIC_SPECS[name]))
+    except Exception as e:
+        logging.error(f"生成报告失败: {e}")
+        return False
+
+    quality = Counter()
+
+    def on_rows(name, rows):
+        sink.write_rows(sheet_names[name], rows)
+        quality.update(row['数据质量'] for row in rows if '数据质量' in row)
+
+    try:
+        results, summary = run_peak_analysis(metrics, start_date, end_date, on_rows=on_rows, **kwargs)
+        if results is None:
+            sink.abort()
+            return False
+        if sink.row_count() == 0:
+            logging.warning("未找到有效数据，可能原因：1. 监控项未正确配置 2. 指定时间段无历史数据")
+            sink.abort()
+            return False
+        sink.add_sheet('执行摘要', dtypes=SUMMARY_DTYPES)
+        sink.write_rows('执行摘要', [{'参数': key, '值': value} for key, value in summary.items()])
+        sink.close()
+    except Exception as e:
+        logging.error(f"生成报告失败: {e}")
+        sink.abort()
+        return False
+
+    logging.info(f"成功生成报告: {output_file}")
+    for name in metrics:
+        logging.info(f"{METRIC_SPECS[name]['label']}: {sink.row_count(sheet_names[name])} 条记录")
+    if quality:
+        logging.info(f"数据质量分布: {dict(quality)}")
+    return True
+
+
+if __name__ == "__main__":
+    # 一次下载同时生成CPU、内存和磁盘的峰值报表
+    run_peak_report(
+        ["cpu", "memory", "disk"],
+        start_date="20250301",
+        end_date="20250302",
+        output_file=r"C:\software\daily_peak.xlsx",
+        window_size=15,
+        threshold=90
+    )
@@ -0,0 +1,419 @@
+import os
+import csv
+import glob
+import logging
+from urllib.parse import quote
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from openpyxl import Workbook
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# CSV / Parquet 每次写入磁盘的行数
+DEFAULT_CSV_CHUNK_ROWS = 10000
+DEFAULT_PARQUET_CHUNK_ROWS = 100000
+
+# 列类型中日期和时间字符串的格式
+DATE_FORMATS = ("%Y%m%d", "%Y-%m-%d")
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_cell_value(value):
+    """列表、字典等非标量字段转换为字符串后写入单元格"""
+    return str(value) if isinstance(value, (list, dict, set, tuple)) else value
+
+
+class ReportSink(ABC):
+    """
+    流式报表输出：按工作表逐行追加，不在内存中保留完整结果。
+    每个工作表的列在第一次写入（或 add_sheet）时确定，之后出现的新字段会被忽略并记录一次警告。
+    可作为上下文管理器使用：正常退出时保存，发生异常时丢弃。
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._columns = {}
+        self._dtypes = {}
+        self._row_counts = {}
+        self._warned = set()
+
+    def add_sheet(self, sheet_name, columns=None, dtypes=None):
+        """
+        预先创建工作表（用于固定工作表顺序）
+        :param sheet_name: 工作表名称
+        :param columns: 列名列表，默认为None（取第一行的字段）
+        :param dtypes: {列名: 列类型}，只有列式输出（Parquet）使用，类型写法见 ParquetSink
+        """
+        if dtypes and sheet_name not in self._dtypes:
+            self._dtypes[sheet_name] = dict(dtypes)
+        if sheet_name not in self._row_counts:
+            self._row_counts[sheet_name] = 0
+            self._create_sheet(sheet_name)
+        if columns is not None and sheet_name not in self._columns:
+            self._columns[sheet_name] = list(columns)
+            self._write_header(sheet_name, self._columns[sheet_name])
+
+    def write_row(self, sheet_name, row):
+        """追加一行（字典）"""
+        self.write_rows(sheet_name, [row])
+
+    def write_rows(self, sheet_name, rows):
+        """
+        追加多行（字典的可迭代对象）
+        :return: 写入的行数
+        """
+        count = 0
+        for row in rows:
+            if sheet_name not in self._columns:
+                self.add_sheet(sheet_name, list(row.keys()))
+            columns = self._columns[sheet_name]
+            if sheet_name not in self._warned and any(key not in columns for key in row):
+                self._warned.add(sheet_name)
+                logging.warning(f"工作表 {sheet_name} 出现新的字段，已忽略: {[key for key in row if key not in columns]}")
+            self._write_values(sheet_name, [self._cell_value(row.get(column)) for column in columns])
+            count += 1
+        self._row_counts[sheet_name] = self._row_counts.get(sheet_name, 0) + count
+        return count
+
+    def row_count(self, sheet_name=None):
+        """已写入的数据行数（不含表头），不指定工作表时为全部工作表的合计"""
+        if sheet_name is not None:
+            return self._row_counts.get(sheet_name, 0)
+        return sum(self._row_counts.values())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @abstractmethod
+    def _create_sheet(self, sheet_name):
+        """创建工作表"""
+
+    def _write_header(self, sheet_name, columns):
+        self._write_values(sheet_name, columns)
+
+    def _cell_value(self, value):
+        return to_cell_value(value)
+
+    @abstractmethod
+    def _write_values(self, sheet_name, values):
+        """追加一行单元格值"""
+
+    @abstractmethod
+    def close(self):
+        """保存文件"""
+
+    @abstractmethod
+    def abort(self):
+        """放弃输出，不保存（已写出的临时数据一并删除）"""
+
+
+class ExcelSink(ReportSink):
+    """
+    Excel 流式输出：安装了 xlsxwriter 时默认使用其 constant_memory 模式，否则使用 openpyxl 的 write-only 模式；
+    也可以用 engine 指定 "xlsxwriter" 或 "openpyxl"
+    """
+
+    def __init__(self, file_path, engine=None):
+        super().__init__(file_path)
+        if engine is None:
+            engine = "openpyxl" if xlsxwriter is None else "xlsxwriter"
+        self.engine = engine
+        self._sheets = {}
+        self._next_row = {}
+        if engine == "xlsxwriter":
+            if xlsxwriter is None:
+                raise ImportError("engine='xlsxwriter' 需要安装 xlsxwriter")
+            self._workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+        elif engine == "openpyxl":
+            self._workbook = Workbook(write_only=True)
+        else:
+            raise ValueError(f"不支持的 Excel 引擎: {engine}")
+
+    def _create_sheet(self, sheet_name):
+        if self.engine == "xlsxwriter":
+            self._sheets[sheet_name] = self._workbook.add_worksheet(sheet_name)
+            self._next_row[sheet_name] = 0
+        else:
+            self._sheets[sheet_name] = self._workbook.create_sheet(sheet_name)
+
+    def _write_values(self, sheet_name, values):
+        if self.engine == "xlsxwriter":
+            self._sheets[sheet_name].write_row(self._next_row[sheet_name], 0, values)
+            self._next_row[sheet_name] += 1
+        else:
+            self._sheets[sheet_name].append(values)
+
+    def close(self):
+        if not self._sheets:
+            # 空工作簿无法保存，保留一个空工作表
+            self._create_sheet("Sheet1")
+        if self.engine == "xlsxwriter":
+            self._workbook.close()
+        else:
+            self._workbook.save(self.file_path)
+
+    def abort(self):
+        if self.engine == "xlsxwriter":
+            # constant_memory 模式的临时文件在关闭时清理，关闭后删除生成的文件
+            self._workbook.close()
+            if os.path.exists(self.file_path):
+                os.remove(self.file_path)
+
+
+class CsvSink(ReportSink):
+    """
+    CSV 流式输出：按块写入磁盘。第一个工作表写入 file_path，
+    其余工作表写入同目录下的 "<文件名>_<工作表名>.csv"。
+    """
+
+    def __init__(self, file_path, chunk_rows=DEFAULT_CSV_CHUNK_ROWS, encoding="utf-8-sig"):
+        super().__init__(file_path)
+        self.chunk_rows = chunk_rows
+        self.encoding = encoding
+        self._files = {}
+        self._writers = {}
+        self._buffers = {}
+
+    def sheet_path(self, sheet_name):
+        """工作表对应的 CSV 文件路径"""
+        if not self._files or sheet_name == next(iter(self._files)):
+            return self.file_path
+        stem, ext = os.path.splitext(self.file_path)
+        return f"{stem}_{sheet_name}{ext or '.csv'}"
+
+    def _create_sheet(self, sheet_name):
+        path = self.sheet_path(sheet_name)
+        self._files[sheet_name] = open(path, "w", newline="", encoding=self.encoding)
+        self._writers[sheet_name] = csv.writer(self._files[sheet_name])
+        self._buffers[sheet_name] = []
+
+    def _write_values(self, sheet_name, values):
+        buffer = self._buffers[sheet_name]
+        buffer.append(values)
+        if len(buffer) >= self.chunk_rows:
+            self._flush(sheet_name)
+
+    def _flush(self, sheet_name):
+        self._writers[sheet_name].writerows(self._buffers[sheet_name])
+        self._buffers[sheet_name] = []
+
+    def close(self):
+        if not self._files:
+            self._create_sheet("Sheet1")
+        for sheet_name, file in self._files.items():
+            self._flush(sheet_name)
+            file.close()
+
+    def abort(self):
+        for file in self._files.values():
+            file.close()
+            if os.path.exists(file.name):
+                os.remove(file.name)
+
+
+def arrow_type(dtype):
+    """
+    列类型写法转换为 pyarrow 类型：
+    "str"、"int"、"float"、"bool"、"date"、"datetime"、"category"（字典编码的字符串），
+    {字段: 类型} 表示结构体，[类型] 表示列表，也可以直接使用 pyarrow 类型
+    """
+    if isinstance(dtype, dict):
+        return pa.struct([(name, arrow_type(field_type)) for name, field_type in dtype.items()])
+    if isinstance(dtype, list):
+        return pa.list_(arrow_type(dtype[0]))
+    if isinstance(dtype, str):
+        return {
+            "str": pa.string(),
+            "int": pa.int64(),
+            "float": pa.float64(),
+            "bool": pa.bool_(),
+            "date": pa.date32(),
+            "datetime": pa.timestamp("s"),
+            "category": pa.dictionary(pa.int32(), pa.string()),
+        }[dtype]
+    return dtype
+
+
+def _parse_date(value, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def convert_value(value, dtype):
+    """
+    按列类型转换单个值（如 "20250301" 转为日期、"N/A" 转为空值），无法转换时返回 None
+    """
+    if value is None:
+        return None
+    if isinstance(dtype, dict):
+        return {name: convert_value(value.get(name), field_type) for name, field_type in dtype.items()} if isinstance(value, dict) else None
+    if isinstance(dtype, list):
+        return [convert_value(item, dtype[0]) for item in value] if isinstance(value, (list, tuple, set)) else None
+    if dtype in ("int", "float"):
+        try:
+            return int(value) if dtype == "int" else float(value)
+        except (TypeError, ValueError):
+            return None
+    if dtype == "date":
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        parsed = _parse_date(str(value), DATE_FORMATS)
+        return parsed.date() if parsed else None
+    if dtype == "datetime":
+        return value if isinstance(value, datetime) else _parse_date(str(value), (DATETIME_FORMAT,))
+    if dtype in ("str", "category"):
+        return str(value)
+    if dtype == "bool":
+        return bool(value)
+    return value
+
+
+class ParquetSink(ReportSink):
+    """
+    Parquet 流式输出（需要安装 pyarrow）：file_path 为输出目录，每个工作表一个子目录，按块写入列式文件。
+    指定 partition_by 时，包含该列的工作表再按列值分为 Hive 风格的子目录（如 "日期=2025-03-01/"，空值为
+    "__HIVE_DEFAULT_PARTITION__"），分区列只保存在目录名中，pyarrow.dataset、Spark、DuckDB 可按该列裁剪分区。
+    目录名不带类型，读取时显式指定分区列类型才能保持日期类型，例如：
+        pyarrow.dataset.dataset(目录, partitioning=pyarrow.dataset.partitioning(
+            pyarrow.schema([("日期", pyarrow.date32())]), flavor="hive"))
+    不指定时 pyarrow.parquet.read_table / pandas.read_parquet 会把分区列读为字符串（字典编码）。
+    列类型由 add_sheet 的 dtypes 指定（写法见 arrow_type），未指定的列按第一块数据推断。
+    """
+
+    def __init__(self, file_path, partition_by=None, chunk_rows=DEFAULT_PARQUET_CHUNK_ROWS):
+        if pa is None:
+            raise ImportError("Parquet 输出需要安装 pyarrow")
+        super().__init__(file_path)
+        self.partition_by = partition_by
+        self.chunk_rows = chunk_rows
+        self._buffers = {}
+        self._types = {}
+        self._parts = {}
+        self._written = []
+
+    def sheet_dir(self, sheet_name):
+        """工作表对应的输出目录"""
+        return os.path.join(self.file_path, sheet_name)
+
+    def _create_sheet(self, sheet_name):
+        # 与写入 Excel/CSV 文件一样覆盖上一次的输出
+        for old_file in glob.glob(os.path.join(glob.escape(self.sheet_dir(sheet_name)), "**", "part-*.parquet"), recursive=True):
+            os.remove(old_file)
+        self._buffers[sheet_name] = []
+        self._types[sheet_name] = {}
+        self._parts[sheet_name] = 0
+
+    def _write_header(self, sheet_name, columns):
+        pass
+
+    def _cell_value(self, value):
+        return value
+
+    def _write_values(self, sheet_name, values):
+        buffer = self._buffers[sheet_name]
+        buffer.append(values)
+        if len(buffer) >= self.chunk_rows:
+            self._flush(sheet_name)
+
+    def _build_table(self, sheet_name, rows):
+        columns = self._columns.get(sheet_name, [])
+        dtypes = self._dtypes.get(sheet_name, {})
+        types = self._types[sheet_name]
+        arrays = []
+        for i, column in enumerate(columns):
+            values = [row[i] for row in rows]
+            if column in dtypes:
+                dtype = dtypes[column]
+                array = pa.array([convert_value(value, dtype) for value in values], type=arrow_type(dtype))
+            elif column in types:
+                array = pa.array(values, type=types[column])
+            else:
+                array = pa.array(values)
+                if pa.types.is_null(array.type):
+                    array = array.cast(pa.string())
+                types[column] = array.type
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, names=columns)
+
+    def _write_table(self, sheet_name, table, partition=None):
+        directory = self.sheet_dir(sheet_name)
+        if partition is not None:
+            directory = os.path.join(directory, partition)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{self._parts[sheet_name]:05d}.parquet")
+        pq.write_table(table, path)
+        self._written.append(path)
+
+    def _flush(self, sheet_name):
+        rows = self._buffers[sheet_name]
+        if not rows:
+            return
+        self._buffers[sheet_name] = []
+        table = self._build_table(sheet_name, rows)
+        if self.partition_by in table.column_names:
+            keys = table.column(self.partition_by).to_pylist()
+            for key in dict.fromkeys(keys):
+                mask = pa.array([item == key for item in keys])
+                if key is None:
+                    value = "__HIVE_DEFAULT_PARTITION__"
+                else:
+                    value = quote(key.isoformat() if isinstance(key, date) else str(key), safe="")
+                part = table.filter(mask).drop_columns([self.partition_by])
+                self._write_table(sheet_name, part, f"{self.partition_by}={value}")
+        else:
+            self._write_table(sheet_name, table)
+        self._parts[sheet_name] += 1
+
+    def close(self):
+        for sheet_name in self._buffers:
+            self._flush(sheet_name)
+            if self._parts[sheet_name] == 0:
+                # 没有数据的工作表也写入一个只有列结构的文件，读取时列和类型不丢失
+                self._write_table(sheet_name, self._build_table(sheet_name, []))
+
+    def abort(self):
+        for path in self._written:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def open_sink(file_path, file_format=None, engine=None, chunk_rows=None, partition_by=None):
+    """
+    根据文件格式创建流式输出
+    :param file_path: 输出文件路径（Parquet 为输出目录）
+    :param file_format: "xlsx"、"csv" 或 "parquet"，默认为None（按扩展名判断）
+    :param engine: Excel 引擎（"openpyxl" 或 "xlsxwriter"），默认为None（安装了 xlsxwriter 时优先使用）
+    :param chunk_rows: CSV / Parquet 每次写入磁盘的行数，默认为None（使用各自的默认值）
+    :param partition_by: Parquet 的分区列（如 "日期"），默认为None（不分区）
+    :return: ReportSink
+    """
+    file_format = (file_format or os.path.splitext(file_path)[1].lstrip(".") or "xlsx").lower()
+    if file_format == "xlsx":
+        return ExcelSink(file_path, engine=engine)
+    if file_format == "csv":
+        return CsvSink(file_path, chunk_rows=chunk_rows or DEFAULT_CSV_CHUNK_ROWS)
+    if file_format == "parquet":
+        return ParquetSink(file_path, partition_by=partition_by, chunk_rows=chunk_rows or DEFAULT_PARQUET_CHUNK_ROWS)
+    raise ValueError("不支持的文件格式，仅支持 'csv'、'xlsx' 和 'parquet'")
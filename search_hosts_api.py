@@ -5,6 +5,17 @@ from pyzabbix import ZabbixAPI
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+DEFAULT_RETURN_FIELDS = ["主机ID", "主机名称", "可见名称", "IP地址", "是否启用", "接口类型", "组信息", "模板信息", "代理信息", "Trigger ID", "Trigger Name", "Trigger 是否启用", "Tags"]
+DEFAULT_PAGE_SIZE = 500
+
+# 主机信息各字段的类型（用于 Parquet 等列式输出，写法见 report_sink.arrow_type）
+HOST_INFO_DTYPES = {
+    "主机ID": "int", "主机名称": "str", "可见名称": "str", "IP地址": "str", "是否启用": "category", "接口类型": "category",
+    "组信息": [{"组ID": "int", "组名称": "str"}], "模板信息": [{"模板ID": "int", "模板名称": "str"}],
+    "代理信息": {"代理ID": "int", "代理名称": "str"}, "Trigger ID": "int", "Trigger Name": "str",
+    "Trigger 是否启用": "category", "Tags": [{"标签": "str", "值": "str"}]
+}
+
 def get_host_info(zapi: ZabbixAPI, host_name: str = None, ip_address: str = None, keyword: str = None, template_name: str = None, group_name: str = None, proxy_name: str = None, return_fields: list = None) -> list:
     """
     获取主机的详细信息，可通过主机名称、IP 地址、关键字、模板名称、组名称、代理名称筛选，并决定返回哪些字段。
@@ -18,30 +29,34 @@ def get_host_info(zapi: ZabbixAPI, host_name: str = None, ip_address: str = None
     :param return_fields: 返回的字段列表（可选，默认为 ["主机ID", "主机名称", "可见名称", "IP地址", "是否启用", "接口类型", "组信息", "模板信息", "代理信息", "Trigger ID", "Trigger Name", "Trigger 是否启用", "Tags"]）
     :return: 主机信息列表
     """
+    return list(iter_host_info(zapi, host_name=host_name, ip_address=ip_address, keyword=keyword,
+                               template_name=template_name, group_name=group_name, proxy_name=proxy_name,
+                               return_fields=return_fields))
+
+def iter_host_info(zapi: ZabbixAPI, host_name: str = None, ip_address: str = None, keyword: str = None, template_name: str = None, group_name: str = None, proxy_name: str = None, return_fields: list = None, page_size: int = DEFAULT_PAGE_SIZE):
+    """
+    分页获取主机的详细信息并逐行返回（生成器），参数与 get_host_info 相同。
+    先只查询符合条件的主机ID，再按 hostid 排序分段请求详细信息，避免一次性加载全部主机。
+    :param page_size: 每页主机数量（默认 500）
+    :return: 逐行返回的主机信息字典
+    """
     logging.info("开始获取主机信息")
 
     # 定义默认返回字段
-    default_return_fields = ["主机ID", "主机名称", "可见名称", "IP地址", "是否启用", "接口类型", "组信息", "模板信息", "代理信息", "Trigger ID", "Trigger Name", "Trigger 是否启用", "Tags"]
-    return_fields = return_fields or default_return_fields
+    return_fields = return_fields or DEFAULT_RETURN_FIELDS
 
-    # 获取代理信息缓存
+    # 获取代理信息缓存（仅在返回代理信息时查询）
     proxy_info_cache = {}
-    try:
-        proxies = zapi.proxy.get(output=["proxyid", "host"])
-        proxy_info_cache = {proxy["proxyid"]: {"代理ID": proxy["proxyid"], "代理名称": proxy["host"]} for proxy in proxies}
-    except Exception as e:
-        logging.exception("获取代理信息失败")
-        proxy_info_cache = {"无代理ID": {"代理ID": "无代理ID", "代理名称": "无代理名称"}}
+    if "代理信息" in return_fields:
+        try:
+            proxies = zapi.proxy.get(output=["proxyid", "host"])
+            proxy_info_cache = {proxy["proxyid"]: {"代理ID": proxy["proxyid"], "代理名称": proxy["host"]} for proxy in proxies}
+        except Exception as e:
+            logging.exception("获取代理信息失败")
+            proxy_info_cache = {"无代理ID": {"代理ID": "无代理ID", "代理名称": "无代理名称"}}
 
     # 定义筛选条件
-    params = {
-        "output": ["hostid", "host", "name", "status", "proxy_hostid"],
-        "selectInterfaces": ["ip", "type"],
-        "selectGroups": "extend",
-        "selectParentTemplates": "extend",
-        "selectTriggers": "extend",
-        "selectTags": "extend"
-    }
+    params = {}
 
     if host_name:
         params.setdefault("filter", {})["host"] = host_name
@@ -59,64 +74,121 @@ def get_host_info(zapi: ZabbixAPI, host_name: str = None, ip_address: str = None
         proxy_ids = [proxy["proxyid"] for proxy in zapi.proxy.get(output=["proxyid"], search={"host": proxy_name})]
         params["proxyids"] = proxy_ids
 
-    # 请求 Zabbix API
+    # 先只获取符合条件的主机ID
     try:
-        host_info = zapi.do_request(method="host.get", params=params).get("result", [])
+        id_params = dict(params, output=["hostid"])
+        host_ids = sorted((host["hostid"] for host in zapi.do_request(method="host.get", params=id_params).get("result", [])), key=int)
     except Exception as e:
         logging.exception("Zabbix API 请求失败")
         raise Exception("Zabbix API 请求失败: {}".format(str(e)))
+    logging.info(f"符合条件的主机共 {len(host_ids)} 台，每页 {page_size} 台")
+
+    detail_params = build_host_output_params(return_fields)
+
+    for i in range(0, len(host_ids), page_size):
+        # 按 hostid 分段请求 Zabbix API
+        try:
+            page_params = dict(detail_params, hostids=host_ids[i:i + page_size])
+            host_info = zapi.do_request(method="host.get", params=page_params).get("result", [])
+        except Exception as e:
+            logging.exception("Zabbix API 请求失败")
+            raise Exception("Zabbix API 请求失败: {}".format(str(e)))
+
+        for host in host_info:
+            yield from flatten_host_info(host, proxy_info_cache, return_fields)
+
+# 返回字段 -> 所需的 host.get output 字段
+FIELD_OUTPUT_MAP = {
+    "主机名称": "host",
+    "可见名称": "name",
+    "是否启用": "status",
+    "代理信息": "proxy_hostid"
+}
+
+# 返回字段 -> 所需的 select 参数及其最小输出
+FIELD_SELECT_MAP = {
+    "IP地址": ("selectInterfaces", ["ip", "type"]),
+    "接口类型": ("selectInterfaces", ["ip", "type"]),
+    "组信息": ("selectGroups", ["groupid", "name"]),
+    "模板信息": ("selectParentTemplates", ["templateid", "name"]),
+    "Trigger ID": ("selectTriggers", ["triggerid"]),
+    "Trigger Name": ("selectTriggers", ["description"]),
+    "Trigger 是否启用": ("selectTriggers", ["status"]),
+    "Tags": ("selectTags", ["tag", "value"])
+}
+
+def build_host_output_params(return_fields: list) -> dict:
+    """
+    根据返回字段生成最小的 host.get 输出参数，未请求的 select 子句不发送。
+    每个触发器对应一行，因此即使不返回触发器字段也会查询触发器ID以保持行数不变。
+    :param return_fields: 返回的字段列表
+    :return: host.get 的 output/select* 参数
+    """
+    output = ["hostid"] + [FIELD_OUTPUT_MAP[field] for field in return_fields if field in FIELD_OUTPUT_MAP]
+    params = {"output": list(dict.fromkeys(output)), "selectTriggers": ["triggerid"], "sortfield": "hostid"}
+    for field in return_fields:
+        if field in FIELD_SELECT_MAP:
+            select, select_output = FIELD_SELECT_MAP[field]
+            current = params.get(select, [])
+            params[select] = list(dict.fromkeys(current + select_output))
+    return params
+
+def flatten_host_info(host: dict, proxy_info_cache: dict, return_fields: list) -> list:
+    """
+    将单个主机展开为每个触发器一行的主机信息。
+    :param host: host.get 返回的主机信息字典
+    :param proxy_info_cache: 代理信息缓存
+    :param return_fields: 返回的字段列表
+    :return: 主机信息列表
+    """
+    # 主机基础信息
+    host_id = host.get("hostid", "").strip()
+    host_name_actual = host.get("host", "").strip()
+    visible_name = host.get("name", "").strip()
+    status = "启用" if host.get("status") == "0" else "禁用"
+
+    # 获取主机接口信息
+    ip, interface_type = get_host_interface_info(host)
+
+    # 获取主机组信息
+    group_info = get_host_group_info(host)
+
+    # 获取主机模板信息
+    template_info = get_host_template_info(host)
+
+    # 获取代理信息
+    proxy_info = get_host_proxy_info(host, proxy_info_cache)
+
+    # 获取主机触发器信息
+    triggers = get_host_trigger_info(host)
+
+    # 获取主机 Tags 信息
+    tags = get_host_tags_info(host)
+
+    rows = []
+    for trigger in triggers:
+        # 组合主机信息和触发器信息
+        host_data = {
+            "主机ID": host_id,
+            "主机名称": host_name_actual,
+            "可见名称": visible_name,
+            "IP地址": ip,
+            "是否启用": status,
+            "接口类型": interface_type,
+            "组信息": group_info,
+            "模板信息": template_info,
+            "代理信息": proxy_info,
+            "Trigger ID": trigger.get("triggerid", "未知Trigger ID"),
+            "Trigger Name": trigger.get("description", "未知Trigger Name"),
+            "Trigger 是否启用": "启用" if trigger.get("status") == "0" else "禁用",
+            "Tags": tags
+        }
+
+        # 仅返回需要的字段
+        host_data = {field: host_data[field] for field in return_fields if field in host_data}
+        rows.append(host_data)
 
-    # 结果列表
-    all_host_info = []
-
-    for host in host_info:
-        # 主机基础信息
-        host_id = host.get("hostid", "").strip()
-        host_name_actual = host.get("host", "").strip()
-        visible_name = host.get("name", "").strip()
-        status = "启用" if host.get("status") == "0" else "禁用"
-
-        # 获取主机接口信息
-        ip, interface_type = get_host_interface_info(host)
-
-        # 获取主机组信息
-        group_info = get_host_group_info(host)
-
-        # 获取主机模板信息
-        template_info = get_host_template_info(host)
-
-        # 获取代理信息
-        proxy_info = get_host_proxy_info(host, proxy_info_cache)
-
-        # 获取主机触发器信息
-        triggers = get_host_trigger_info(host)
-
-        # 获取主机 Tags 信息
-        tags = get_host_tags_info(host)
-
-        for trigger in triggers:
-            # 组合主机信息和触发器信息
-            host_data = {
-                "主机ID": host_id,
-                "主机名称": host_name_actual,
-                "可见名称": visible_name,
-                "IP地址": ip,
-                "是否启用": status,
-                "接口类型": interface_type,
-                "组信息": group_info,
-                "模板信息": template_info,
-                "代理信息": proxy_info,
-                "Trigger ID": trigger.get("triggerid", "未知Trigger ID"),
-                "Trigger Name": trigger.get("description", "未知Trigger Name"),
-                "Trigger 是否启用": "启用" if trigger.get("status") == "0" else "禁用",
-                "Tags": tags
-            }
-
-            # 仅返回需要的字段
-            host_data = {field: host_data[field] for field in return_fields if field in host_data}
-            all_host_info.append(host_data)
-
-    return all_host_info
+    return rows
 
 def get_host_interface_info(host: dict) -> tuple:
     """
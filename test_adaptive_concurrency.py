@@ -0,0 +1,95 @@
+import pytest
+import requests
+from adaptive_concurrency import AdaptiveConcurrencyLimiter, is_overload_error, full_jitter_delay
+
+
+def make_limiter(**kwargs):
+    kwargs.setdefault("base_delay", 0)
+    return AdaptiveConcurrencyLimiter(**kwargs)
+
+
+def test_success_increases_limit_about_one_per_round():
+    limiter = make_limiter(initial_limit=4, max_limit=32)
+    for _ in range(5):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 5
+
+
+def test_limit_capped_at_max_limit():
+    limiter = make_limiter(initial_limit=2, max_limit=3)
+    for _ in range(50):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 3
+
+
+def test_overload_halves_limit():
+    limiter = make_limiter(initial_limit=8)
+    limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 4
+    assert limiter.stats()["overloads"] == 1
+
+
+def test_one_decrease_per_round():
+    """同一轮已发出的请求过载只减小一次，之后发出的请求过载再减小"""
+    limiter = make_limiter(initial_limit=8)
+    round_one = [limiter.acquire() for _ in range(4)]
+    for started in round_one:
+        limiter.release(started, overloaded=True)
+    assert limiter.limit == 4
+
+    limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 2
+
+
+def test_limit_not_below_min_limit():
+    limiter = make_limiter(initial_limit=2, min_limit=1)
+    for _ in range(5):
+        limiter.release(limiter.acquire(), overloaded=True)
+    assert limiter.limit == 1
+
+
+def test_slow_success_is_not_an_overload(monkeypatch):
+    limiter = make_limiter(initial_limit=4)
+    started = limiter.acquire()
+    monkeypatch.setattr("adaptive_concurrency.time.monotonic", lambda: started + 600)
+    limiter.release(started)
+    assert limiter.limit == 4
+    assert limiter.stats()["overloads"] == 0
+
+
+def test_call_retries_then_raises(monkeypatch):
+    monkeypatch.setattr("adaptive_concurrency.time.sleep", lambda seconds: None)
+    limiter = make_limiter(initial_limit=8)
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise requests.Timeout("timeout")
+
+    with pytest.raises(requests.Timeout):
+        limiter.call(fail, max_retries=3)
+    assert len(calls) == 3
+    assert limiter.in_flight == 0
+    assert limiter.limit < 8
+
+
+def test_call_returns_result():
+    limiter = make_limiter()
+    assert limiter.call(lambda x: x * 2, 21) == 42
+    assert limiter.in_flight == 0
+
+
+def test_is_overload_error():
+    response = requests.Response()
+    response.status_code = 503
+    assert is_overload_error(requests.HTTPError(response=response))
+    response.status_code = 404
+    assert not is_overload_error(requests.HTTPError(response=response))
+    assert is_overload_error(requests.ConnectionError())
+    assert is_overload_error(TimeoutError())
+    assert not is_overload_error(ValueError("Invalid params"))
+
+
+def test_full_jitter_delay_bounds():
+    for attempt in range(10):
+        assert 0 <= full_jitter_delay(attempt, base_delay=2, max_delay=60) <= min(60, 2 * 2 ** attempt)
@@ -0,0 +1,93 @@
+import pytest
+import requests
+import create_host
+from create_host import get_existing_hosts, submit_host_batch
+
+
+class _Host:
+    def __init__(self, hosts):
+        self.hosts = hosts
+        self.calls = []
+
+    def get(self, filter, output):
+        self.calls.append(filter["host"])
+        return [{"hostid": self.hosts[name], "host": name} for name in filter["host"] if name in self.hosts]
+
+
+class _Zapi:
+    """模拟服务器：hosts 为已存在的 {主机名: hostid}"""
+
+    def __init__(self, hosts=None):
+        self.host = _Host(dict(hosts or {}))
+
+
+def make_batch(*names):
+    return [(index, name, {"host": name}) for index, name in enumerate(names)]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """替换 post_host_create：bad 中的主机使整批返回 JSON-RPC 错误，timeout 为 True 时先创建再超时"""
+    state = {"bad": set(), "timeout": False, "calls": []}
+
+    def post_host_create(zapi, hosts):
+        names = [host["host"] for host in hosts]
+        state["calls"].append(names)
+        if any(name in state["bad"] for name in names):
+            return {"error": {"code": -32602, "data": f"Invalid params {names}"}}
+        hostids = []
+        for name in names:
+            zapi.host.hosts[name] = str(100 + len(zapi.host.hosts))
+            hostids.append(zapi.host.hosts[name])
+        if state["timeout"]:
+            raise requests.Timeout("timeout")
+        return {"result": {"hostids": hostids}}
+
+    monkeypatch.setattr(create_host, "post_host_create", post_host_create)
+    return state
+
+
+def test_get_existing_hosts():
+    zapi = _Zapi({"a": "1", "b": "2"})
+    assert get_existing_hosts(zapi, {"a", "c"}) == {"a"}
+    assert get_existing_hosts(zapi, set()) == set()
+    assert zapi.host.calls == [["a", "c"]]
+
+
+def test_batch_success(server):
+    zapi = _Zapi()
+    results = submit_host_batch(zapi, make_batch("a", "b", "c"))
+    assert [(r["status"], r["host"]) for r in results] == [("success", "a"), ("success", "b"), ("success", "c")]
+    assert server["calls"] == [["a", "b", "c"]]
+
+
+def test_batch_bisects_to_failing_row(server):
+    server["bad"] = {"c"}
+    zapi = _Zapi()
+    results = submit_host_batch(zapi, make_batch("a", "b", "c", "d"))
+    assert [r["status"] for r in results] == ["success", "success", "error", "success"]
+    assert "-32602" in results[2]["message"]
+    assert server["calls"] == [["a", "b", "c", "d"], ["a", "b"], ["c", "d"], ["c"], ["d"]]
+
+
+def test_timeout_reconciles_without_resubmitting(server):
+    server["timeout"] = True
+    zapi = _Zapi({"a": "1"})
+    existing_before = get_existing_hosts(zapi, {"a", "b", "c"})
+    results = submit_host_batch(zapi, make_batch("a", "b", "c"), existing_before)
+    assert server["calls"] == [["a", "b", "c"]]
+    # a 在提交前已存在，不能算作本次创建
+    assert results[0]["status"] == "error"
+    assert "主机已存在" in results[0]["message"]
+    assert [(r["status"], r["hostid"]) for r in results[1:]] == [("success", zapi.host.hosts["b"]),
+                                                                  ("success", zapi.host.hosts["c"])]
+
+
+def test_timeout_before_commit_reports_error(monkeypatch):
+    def post_host_create(zapi, hosts):
+        raise requests.ConnectionError("connection reset")
+
+    monkeypatch.setattr(create_host, "post_host_create", post_host_create)
+    results = submit_host_batch(_Zapi(), make_batch("a", "b"))
+    assert [r["status"] for r in results] == ["error", "error"]
+    assert "connection reset" in results[0]["message"]
@@ -0,0 +1,54 @@
+from datetime import datetime
+from create_maintenance import (merge_overlapping_windows, plan_maintenances, build_maintenance_params,
+                                get_maintenance_name)
+
+
+def at(hour, minute=0):
+    return datetime(2024, 1, 1, hour, minute)
+
+
+def test_merge_overlapping_windows_same_hosts():
+    windows = [(at(1), at(3), ["1", "2"]), (at(2), at(4), ["2", "1"]), (at(4), at(5), ["1", "2"]),
+               (at(6), at(7), ["1", "2"])]
+    assert merge_overlapping_windows(windows) == [(at(1), at(5), ["1", "2"]), (at(6), at(7), ["1", "2"])]
+
+
+def test_merge_keeps_different_hosts_apart():
+    windows = [(at(1), at(3), ["1"]), (at(2), at(4), ["2"])]
+    assert merge_overlapping_windows(windows) == [(at(1), at(3), ["1"]), (at(2), at(4), ["2"])]
+
+
+def test_merge_combines_equal_ranges():
+    """时间范围相同的维护名称相同，不同主机组需合并为一个维护"""
+    windows = [(at(1), at(2), ["1"]), (at(1), at(2), ["2", "1"]), (at(1, 30), at(2), ["3"]),
+               (at(1, 45), at(2), ["3"])]
+    assert merge_overlapping_windows(windows) == [(at(1), at(2), ["1", "2"]), (at(1, 30), at(2), ["3"])]
+
+
+def existing_maintenance(start_time, end_time, host_ids, maintenanceid="9"):
+    params = build_maintenance_params(start_time, end_time, host_ids, get_maintenance_name(start_time, end_time))
+    return {params["name"]: {"maintenanceid": maintenanceid, "active_since": str(params["active_since"]),
+                             "active_till": str(params["active_till"]),
+                             "hosts": [{"hostid": hostid} for hostid in host_ids]}}
+
+
+def test_plan_creates_missing_maintenance():
+    plan = plan_maintenances([(at(1), at(2), ["1"])], {})
+    assert [params["hostids"] for params in plan["create"]] == [["1"]]
+    assert plan["update"] == [] and plan["skip"] == []
+    assert plan["create"][0]["timeperiods"][0]["period"] == 3600
+
+
+def test_plan_skips_when_hosts_already_covered():
+    existing = existing_maintenance(at(1), at(2), ["1", "2", "3"])
+    plan = plan_maintenances([(at(1), at(2), ["2", "1"])], existing)
+    assert plan["skip"] == [get_maintenance_name(at(1), at(2))]
+    assert plan["create"] == [] and plan["update"] == []
+
+
+def test_plan_update_keeps_existing_hosts():
+    existing = existing_maintenance(at(1), at(2), ["1", "2"])
+    plan = plan_maintenances([(at(1), at(2), ["3", "1"])], existing)
+    assert plan["create"] == [] and plan["skip"] == []
+    assert plan["update"][0]["maintenanceid"] == "9"
+    assert plan["update"][0]["hostids"] == ["1", "2", "3"]
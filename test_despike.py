@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from despike import smooth_spikes, smooth_spikes_array, smooth_spikes_sequential
+
+WINDOW_SIZES = (1, 2, 3, 5, 8, 13)
+THRESHOLDS = (5, 30, 80)
+LENGTHS = (0, 1, 2, 3, 7, 50, 500)
+
+
+def make_series(n, seed, nan_ratio=0.0):
+    """生成带随机尖峰（以及可选缺失值）的测试序列"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 20, n)
+    spikes = rng.random(n) < 0.15
+    values[spikes] += rng.uniform(50, 100, spikes.sum())
+    if nan_ratio:
+        values[rng.random(n) < nan_ratio] = np.nan
+    return pd.Series(values, index=pd.date_range("2025-03-01", periods=n, freq="30s"))
+
+
+def assert_same(expected, actual):
+    np.testing.assert_allclose(np.asarray(actual, dtype=np.float64), expected.to_numpy(dtype=np.float64),
+                               rtol=0, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("n", LENGTHS)
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+@pytest.mark.parametrize("window_size", WINDOW_SIZES)
+def test_array_matches_sequential(window_size, threshold, n):
+    series = make_series(n, seed=window_size * 1000 + threshold * 10 + n)
+    expected = smooth_spikes_sequential(series, window_size, threshold)
+    assert_same(expected, smooth_spikes_array(series.to_numpy(), window_size, threshold))
+
+
+@pytest.mark.parametrize("nan_ratio", (0.05, 0.3, 1.0))
+@pytest.mark.parametrize("n", (3, 7, 50, 500))
+@pytest.mark.parametrize("window_size", (1, 3, 5, 13))
+def test_array_matches_sequential_with_nan(window_size, n, nan_ratio):
+    series = make_series(n, seed=window_size * 1000 + n, nan_ratio=nan_ratio)
+    expected = smooth_spikes_sequential(series, window_size, 30)
+    assert_same(expected, smooth_spikes_array(series.to_numpy(), window_size, 30))
+
+
+@pytest.mark.parametrize("values", (
+    [0, 100, 0, 0, 0, 0],           # 单个尖峰
+    [0, 100, 100, 100, 0, 0, 0],    # 连续尖峰
+    [100, 0, 0, 0, 0, 100],         # 首尾尖峰不处理
+    [0, 0, 100, 0, 100, 0, 100, 0],  # 间隔尖峰，前向窗口使用平滑后的值
+))
+def test_array_matches_sequential_edge_cases(values):
+    series = pd.Series(values, dtype=np.float64)
+    for window_size in (1, 2, 5):
+        assert_same(smooth_spikes_sequential(series, window_size, 50),
+                    smooth_spikes_array(series.to_numpy(), window_size, 50))
+
+
+def test_smooth_spikes_keeps_index_and_name():
+    series = make_series(50, seed=1).rename("cpu")
+    result = smooth_spikes(series, 5, 30)
+    assert result.index.equals(series.index)
+    assert result.name == "cpu"
+    assert_same(smooth_spikes_sequential(series, 5, 30), result)
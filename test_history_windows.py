@@ -0,0 +1,81 @@
+import pytest
+from history_windows import chunks, plan_windows, split_window
+from history_fetch import fetch_history
+
+
+def test_chunks():
+    assert list(chunks([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+    assert list(chunks([], 2)) == []
+
+
+def test_plan_windows_covers_range_once():
+    itemids = [str(i) for i in range(5)]
+    windows = plan_windows(itemids, 100, 349, max_items_per_request=2, chunk_seconds=100)
+    assert [w[0] for w in windows[:3]] == [["0", "1"]] * 3
+    # time_till 包含在内，分片为左闭右开
+    assert [(start, stop) for _, start, stop in windows[:3]] == [(100, 200), (200, 300), (300, 350)]
+    assert len(windows) == 9
+    covered = {(itemid, t) for ids, start, stop in windows for itemid in ids for t in range(start, stop)}
+    assert covered == {(itemid, t) for itemid in itemids for t in range(100, 350)}
+
+
+def test_plan_windows_single_second():
+    assert plan_windows(["1"], 50, 50, 200, 86400) == [(["1"], 50, 51)]
+
+
+def test_plan_windows_empty():
+    assert plan_windows([], 0, 100, 200, 86400) == []
+
+
+def test_split_window_by_items_first():
+    assert split_window(["1", "2", "3"], 0, 100) == [(["1"], 0, 100), (["2", "3"], 0, 100)]
+
+
+def test_split_window_by_time_for_single_item():
+    assert split_window(["1"], 0, 101) == [(["1"], 0, 50), (["1"], 50, 101)]
+
+
+def test_split_window_stops_at_one_second():
+    assert split_window(["1"], 10, 11) is None
+
+
+@pytest.mark.parametrize("itemids,start,stop", [(["1", "2", "3", "4", "5"], 0, 1000), (["1"], 0, 999)])
+def test_split_window_repeatedly_terminates(itemids, start, stop):
+    """反复拆分直到无法再拆，最终每个窗口为单个监控项的一秒，并且覆盖原窗口"""
+    pending, leaves = [(itemids, start, stop)], []
+    while pending:
+        window = pending.pop()
+        halves = split_window(*window)
+        if halves is None:
+            leaves.append(window)
+        else:
+            pending.extend(halves)
+    assert all(len(ids) == 1 and hi - lo == 1 for ids, lo, hi in leaves)
+    assert sorted((ids[0], lo) for ids, lo, _ in leaves) == sorted((i, t) for i in itemids for t in range(start, stop))
+
+
+class _History:
+    """按每秒一条数据模拟 history.get，超过 limit 时截断"""
+
+    def __init__(self, clocks):
+        self.clocks = clocks
+        self.calls = 0
+
+    def get(self, itemids, time_from, time_till, limit, **kwargs):
+        self.calls += 1
+        rows = [{"itemid": itemid, "clock": str(clock), "value": "1"}
+                for itemid in itemids for clock in self.clocks if time_from <= clock <= time_till]
+        return rows[:limit]
+
+
+class _Zapi:
+    def __init__(self, clocks):
+        self.history = _History(clocks)
+
+
+def test_fetch_history_bisects_truncated_responses():
+    zapi = _Zapi(range(0, 100))
+    result = fetch_history(zapi, ["1", "2", "3"], 0, 99, max_rows=40)
+    assert {itemid: [int(row["clock"]) for row in rows] for itemid, rows in result.items()} == \
+        {itemid: list(range(100)) for itemid in ("1", "2", "3")}
+    assert zapi.history.calls > 1
@@ -0,0 +1,99 @@
+from inventory_cache import InventoryCache
+
+
+def make_host(hostid, status="0", ip=None, templateids=("100",)):
+    return {"hostid": hostid, "host": f"host{hostid}", "name": f"主机{hostid}", "status": status, "proxy_hostid": "0",
+            "interfaces": [{"ip": ip or f"10.0.0.{hostid}", "type": "1"}],
+            "parentTemplates": [{"templateid": t, "name": f"模板{t}"} for t in templateids]}
+
+
+class _Host:
+    def __init__(self, hosts):
+        self.hosts = {host["hostid"]: host for host in hosts}
+        self.detail_calls = []
+
+    def get(self, output, hostids=None, **kwargs):
+        if hostids is None:
+            return [{"hostid": hostid} for hostid in self.hosts]
+        self.detail_calls.append(list(hostids))
+        return [self.hosts[hostid] for hostid in hostids if hostid in self.hosts]
+
+
+class _Item:
+    def __init__(self, items):
+        self.items = items
+        self.calls = 0
+
+    def get(self, hostids, search, output):
+        self.calls += 1
+        return [item for item in self.items if item["hostid"] in hostids and search["key_"] in item["key_"]]
+
+
+class _Zapi:
+    def __init__(self, hosts, items=()):
+        self.host = _Host(hosts)
+        self.item = _Item(list(items))
+
+
+def cached_hosts(cache):
+    return {host["hostid"]: host for host in cache.get_hosts()}
+
+
+def test_first_refresh_loads_all_hosts():
+    zapi = _Zapi([make_host("1"), make_host("2", templateids=("100", "101"))])
+    cache = InventoryCache(zapi, db_path=":memory:", chunk_size=1)
+    assert cache.refresh_hosts() == 2
+    hosts = cached_hosts(cache)
+    assert hosts["1"]["ip"] == "10.0.0.1"
+    assert sorted(t["templateid"] for t in hosts["2"]["parentTemplates"]) == ["100", "101"]
+    assert zapi.host.detail_calls == [["1"], ["2"]]
+
+
+def test_refresh_within_ttl_fetches_only_new_hosts():
+    zapi = _Zapi([make_host("1"), make_host("2")])
+    cache = InventoryCache(zapi, db_path=":memory:")
+    cache.refresh_hosts()
+    zapi.host.detail_calls.clear()
+
+    zapi.host.hosts["3"] = make_host("3")
+    del zapi.host.hosts["2"]
+    zapi.host.hosts["1"] = make_host("1", status="1")
+    assert cache.refresh_hosts() == 1
+    assert zapi.host.detail_calls == [["3"]]
+    hosts = cached_hosts(cache)
+    assert sorted(hosts) == ["1", "3"]
+    # 有效期内不会拉取已有主机的变化
+    assert hosts["1"]["status"] == "0"
+
+
+def test_full_refresh_writes_only_changed_hosts():
+    zapi = _Zapi([make_host("1"), make_host("2"), make_host("3")])
+    cache = InventoryCache(zapi, db_path=":memory:")
+    cache.refresh_hosts()
+
+    zapi.host.hosts["1"] = make_host("1", status="1")
+    zapi.host.hosts["2"] = make_host("2", templateids=("200",))
+    assert cache.refresh_hosts(force=True) == 2
+    hosts = cached_hosts(cache)
+    assert hosts["1"]["status"] == "1"
+    assert [t["templateid"] for t in hosts["2"]["parentTemplates"]] == ["200"]
+    assert cache.refresh_hosts(force=True) == 0
+
+
+def test_expired_ttl_triggers_full_refresh():
+    zapi = _Zapi([make_host("1")])
+    cache = InventoryCache(zapi, db_path=":memory:", ttl=0)
+    cache.refresh_hosts()
+    zapi.host.hosts["1"] = make_host("1", ip="10.0.1.1")
+    assert cache.refresh_hosts() == 1
+    assert cached_hosts(cache)["1"]["ip"] == "10.0.1.1"
+
+
+def test_get_items_uses_cache_within_ttl():
+    items = [{"itemid": "10", "hostid": "1", "name": "CPU", "key_": "system.cpu.util", "value_type": "0", "history": "7d"},
+             {"itemid": "11", "hostid": "1", "name": "内存", "key_": "vm.memory.util", "value_type": "0", "history": "7d"}]
+    zapi = _Zapi([make_host("1")], items)
+    cache = InventoryCache(zapi, db_path=":memory:")
+    assert [item["itemid"] for item in cache.get_items(["1"], "system.cpu")] == ["10"]
+    assert [item["itemid"] for item in cache.get_items([1], "system.cpu")] == ["10"]
+    assert zapi.item.calls == 1
@@ -0,0 +1,93 @@
+import csv
+import os
+import pytest
+from datetime import date, datetime
+from report_sink import CsvSink, ParquetSink, convert_value, open_sink
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        return list(csv.reader(file))
+
+
+def test_csv_sink_writes_sheets_to_separate_files(tmp_path):
+    path = str(tmp_path / "report.csv")
+    with CsvSink(path) as sink:
+        sink.write_rows("CPU", [{"host": "a", "peak": 1}, {"host": "b", "peak": 2}])
+        sink.write_row("内存", {"host": "a", "peak": 3})
+        assert sink.sheet_path("内存") == str(tmp_path / "report_内存.csv")
+    assert read_csv(path) == [["host", "peak"], ["a", "1"], ["b", "2"]]
+    assert read_csv(tmp_path / "report_内存.csv") == [["host", "peak"], ["a", "3"]]
+    assert sink.row_count("CPU") == 2
+    assert sink.row_count() == 3
+
+
+def test_csv_sink_flushes_in_chunks(tmp_path):
+    path = str(tmp_path / "report.csv")
+    sink = CsvSink(path, chunk_rows=2)
+    sink.write_rows("Sheet1", ({"n": i} for i in range(4)))
+    # 表头与前三行每两行写入一次，最后一行仍在缓冲区，关闭时写入
+    assert sink._buffers["Sheet1"] == [[3]]
+    sink.close()
+    assert read_csv(path) == [["n"], ["0"], ["1"], ["2"], ["3"]]
+
+
+def test_csv_sink_ignores_new_fields_and_stringifies_lists(tmp_path):
+    path = str(tmp_path / "report.csv")
+    with CsvSink(path) as sink:
+        sink.add_sheet("Sheet1", ["host", "tags"])
+        sink.write_row("Sheet1", {"host": "a", "tags": ["x", "y"], "extra": 1})
+        sink.write_row("Sheet1", {"host": "b"})
+    assert read_csv(path) == [["host", "tags"], ["a", "['x', 'y']"], ["b", ""]]
+
+
+def test_csv_sink_abort_removes_files(tmp_path):
+    path = str(tmp_path / "report.csv")
+    with pytest.raises(RuntimeError):
+        with CsvSink(path) as sink:
+            sink.write_row("CPU", {"host": "a"})
+            sink.write_row("内存", {"host": "a"})
+            raise RuntimeError("interrupted")
+    assert os.listdir(tmp_path) == []
+
+
+def test_open_sink_by_extension(tmp_path):
+    assert isinstance(open_sink(str(tmp_path / "report.csv")), CsvSink)
+    with pytest.raises(ValueError):
+        open_sink(str(tmp_path / "report.txt"))
+
+
+def test_convert_value():
+    assert convert_value("20250301", "date") == date(2025, 3, 1)
+    assert convert_value("2025-03-01", "date") == date(2025, 3, 1)
+    assert convert_value(datetime(2025, 3, 1, 8), "date") == date(2025, 3, 1)
+    assert convert_value("2025-03-01 08:00:00", "datetime") == datetime(2025, 3, 1, 8)
+    assert convert_value("N/A", "float") is None
+    assert convert_value("N/A", "date") is None
+    assert convert_value("12", "int") == 12
+    assert convert_value(None, "str") is None
+    assert convert_value(["1", "x"], ["int"]) == [1, None]
+    assert convert_value({"max": "1.5"}, {"max": "float", "min": "float"}) == {"max": 1.5, "min": None}
+    assert convert_value("1.5", ["float"]) is None
+
+
+def test_parquet_sink_writes_hive_partitions(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    ds = pytest.importorskip("pyarrow.dataset")
+    pq = pytest.importorskip("pyarrow.parquet")
+    with ParquetSink(str(tmp_path), partition_by="日期") as sink:
+        sink.add_sheet("CPU", ["日期", "host", "peak"], dtypes={"日期": "date", "peak": "float"})
+        sink.write_rows("CPU", [{"日期": "20250301", "host": "a", "peak": "1.5"},
+                                {"日期": "20250302", "host": "a", "peak": "N/A"},
+                                {"日期": None, "host": "b", "peak": 3}])
+    assert sorted(os.listdir(tmp_path / "CPU")) == ["日期=2025-03-01", "日期=2025-03-02", "日期=__HIVE_DEFAULT_PARTITION__"]
+    dataset = ds.dataset(str(tmp_path / "CPU"), format="parquet",
+                         partitioning=ds.partitioning(pa.schema([("日期", pa.date32())]), flavor="hive"))
+    assert dataset.schema.field("peak").type == pa.float64()
+    table = dataset.to_table(filter=ds.field("日期") == date(2025, 3, 1))
+    assert table.column("host").to_pylist() == ["a"]
+    assert table.column("peak").to_pylist() == [1.5]
+    # 分区列只保存在目录名中，空值读回为 None
+    assert pq.read_schema(next((tmp_path / "CPU" / "日期=2025-03-01").iterdir())).names == ["host", "peak"]
+    rows = {row["host"]: row for row in dataset.to_table(filter=ds.field("日期").is_null()).to_pylist()}
+    assert rows == {"b": {"host": "b", "peak": 3.0, "日期": None}}
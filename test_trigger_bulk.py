@@ -0,0 +1,70 @@
+import pytest
+import requests
+from pyzabbix import ZabbixAPIException
+from trigger_bulk import build_trigger_row, current_status_from_rows, bulk_update_trigger_status
+
+
+class _Trigger:
+    """模拟 trigger.update：bad 中的触发器返回 JSON-RPC 错误，timeouts 次请求先超时"""
+
+    def __init__(self, bad=(), timeouts=0):
+        self.bad = set(bad)
+        self.timeouts = timeouts
+        self.calls = []
+
+    def update(self, *params):
+        self.calls.append([p["triggerid"] for p in params])
+        if self.timeouts:
+            self.timeouts -= 1
+            raise requests.Timeout("timeout")
+        bad = [p["triggerid"] for p in params if p["triggerid"] in self.bad]
+        if bad:
+            raise ZabbixAPIException(f"Error -32602: Invalid params, {bad}")
+        return {"triggerids": [p["triggerid"] for p in params]}
+
+
+class _Zapi:
+    def __init__(self, **kwargs):
+        self.trigger = _Trigger(**kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr("trigger_bulk.time.sleep", lambda seconds: None)
+
+
+def test_current_status_from_rows():
+    rows = [build_trigger_row({"triggerid": "1", "status": "0", "value": "1"}, "h", "10.0.0.1"),
+            build_trigger_row({"triggerid": "2", "status": "1", "value": "0"}, "h", "10.0.0.1"),
+            {"Trigger ID": None, "Trigger Enabled": "启用"}]
+    assert current_status_from_rows(rows) == {"1": "0", "2": "1"}
+
+
+def test_skips_triggers_already_in_target_state():
+    zapi = _Zapi()
+    report = bulk_update_trigger_status(zapi, {"1": "0", "2": "1", "3": 0}, 1)
+    assert report == {"updated": ["1", "3"], "skipped": ["2"], "failed": []}
+    assert zapi.trigger.calls == [["1", "3"]]
+
+
+def test_updates_in_chunks():
+    zapi = _Zapi()
+    report = bulk_update_trigger_status(zapi, {str(i): "0" for i in range(5)}, 1, chunk_size=2)
+    assert report["updated"] == ["0", "1", "2", "3", "4"]
+    assert zapi.trigger.calls == [["0", "1"], ["2", "3"], ["4"]]
+
+
+def test_bisects_api_errors_without_retrying():
+    zapi = _Zapi(bad={"2"})
+    report = bulk_update_trigger_status(zapi, {str(i): "0" for i in range(4)}, 1)
+    assert report["updated"] == ["0", "1", "3"]
+    assert [f["triggerid"] for f in report["failed"]] == ["2"]
+    # 整批 -> 两半 -> 出错的一半再拆为单个，每次只请求一次
+    assert zapi.trigger.calls == [["0", "1", "2", "3"], ["0", "1"], ["2", "3"], ["2"], ["3"]]
+
+
+def test_retries_overload_errors():
+    zapi = _Zapi(timeouts=2)
+    report = bulk_update_trigger_status(zapi, {"1": "0", "2": "0"}, 1, max_retries=3)
+    assert report["updated"] == ["1", "2"]
+    assert zapi.trigger.calls == [["1", "2"]] * 3
@@ -0,0 +1,179 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from login_zabbix_api import ZabbixClientPool
+from adaptive_concurrency import is_overload_error, full_jitter_delay
+
+STATUS_MAP = {"0": "正常", "1": "问题"}
+VALUE_MAP = {"0": "启用", "1": "禁用"}
+
+# 默认批量参数：单次 host.get 的主机名数量、单次 trigger.get 的主机数量、并发数以及单次 trigger.update 的触发器数量
+DEFAULT_HOST_CHUNK_SIZE = 500
+DEFAULT_TRIGGER_CHUNK_SIZE = 200
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_UPDATE_CHUNK_SIZE = 500
+
+
+def _chunks(values, size):
+    """按固定大小切分列表"""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def build_trigger_row(trigger, host_name, host_ip):
+    """
+    将触发器信息展开为导出行，标签按名称展开为列（同名标签合并为列表）。
+    :param trigger: trigger.get 返回的触发器
+    :param host_name: 主机可见名称
+    :param host_ip: 主机名（IP）
+    :return: 触发器信息字典
+    """
+    tag_info = {
+        "Host Name": host_name,
+        "Host IP": host_ip,
+        "Trigger ID": trigger.get("triggerid", "未知Trigger ID"),
+        "Trigger Name": trigger.get("description", "未知Trigger Name"),
+        "Trigger Status": STATUS_MAP.get(trigger.get("value"), "未知"),
+        "Trigger Enabled": VALUE_MAP.get(trigger.get("status"), "未知"),
+    }
+    for tag in trigger.get("tags", []):
+        tag_name = tag.get('tag')
+        tag_value = tag.get('value')
+        if tag_name in tag_info:
+            existing_value = tag_info[tag_name]
+            if isinstance(existing_value, list):
+                tag_info[tag_name].append(tag_value)
+            else:
+                tag_info[tag_name] = [existing_value, tag_value]
+        else:
+            tag_info[tag_name] = tag_value
+    return tag_info
+
+
+def resolve_hosts_by_name(zabbix_api, host_names, chunk_size=DEFAULT_HOST_CHUNK_SIZE):
+    """
+    用 host.get(filter={"host": [...]}) 批量解析主机名。
+    :param zabbix_api: Zabbix API 会话
+    :param host_names: 主机名列表
+    :param chunk_size: 单次请求的主机名数量
+    :return: ({hostid: 主机信息}（按输入顺序）, 未找到的主机名列表)
+    """
+    host_names = [str(name) for name in dict.fromkeys(host_names)]
+    by_name = {}
+    for chunk in _chunks(host_names, chunk_size):
+        for host in zabbix_api.host.get(filter={"host": chunk}, output=["hostid", "name", "host"]):
+            by_name[host["host"]] = host
+
+    hosts = {by_name[name]["hostid"]: by_name[name] for name in host_names if name in by_name}
+    missing = [name for name in host_names if name not in by_name]
+    return hosts, missing
+
+
+def fetch_triggers_for_hosts(zabbix_api, hostids, trigger_name=None, chunk_size=DEFAULT_TRIGGER_CHUNK_SIZE,
+                             max_workers=DEFAULT_MAX_WORKERS):
+    """
+    按主机分块并发拉取触发器，每个触发器附带所属主机ID。
+    只有传入线程安全的 ZabbixClientPool 时才并发执行，普通 ZabbixAPI 会话按顺序执行。
+    :param zabbix_api: Zabbix API 会话
+    :param hostids: 主机ID列表
+    :param trigger_name: 触发器名称（模糊匹配，可选）
+    :param chunk_size: 单次 trigger.get 的主机数量
+    :param max_workers: 最大并发请求数
+    :return: {hostid: [触发器列表]}
+    """
+    search_params = {"description": trigger_name} if trigger_name else {}
+
+    def fetch(chunk):
+        return zabbix_api.trigger.get(
+            hostids=chunk,
+            search=search_params,
+            output=["triggerid", "description", "value", "status", "tags"],
+            selectHosts=["hostid"]
+        )
+
+    chunks = list(_chunks(list(hostids), chunk_size))
+    if not isinstance(zabbix_api, ZabbixClientPool):
+        max_workers = 1
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks) or 1))) as executor:
+        results = list(executor.map(fetch, chunks))
+
+    triggers_by_host = {hostid: [] for hostid in hostids}
+    for triggers in results:
+        for trigger in triggers:
+            for host in trigger.get("hosts", []):
+                if host["hostid"] in triggers_by_host:
+                    triggers_by_host[host["hostid"]].append(trigger)
+    logging.debug(f"共 {len(chunks)} 次 trigger.get 获取到 {sum(len(t) for t in triggers_by_host.values())} 个触发器")
+    return triggers_by_host
+
+
+# 导出行中的启用状态文字 -> trigger.update 的 status 取值
+STATUS_CODE_MAP = {text: code for code, text in VALUE_MAP.items()}
+
+
+def current_status_from_rows(trigger_info):
+    """
+    从导出行中提取触发器当前的启用状态。
+    :param trigger_info: build_trigger_row 生成的行列表
+    :return: {triggerid: "0"/"1"}
+    """
+    return {
+        info["Trigger ID"]: STATUS_CODE_MAP.get(info.get("Trigger Enabled"), info.get("Trigger Enabled"))
+        for info in trigger_info if info.get("Trigger ID")
+    }
+
+
+def _update_chunk(zabbix_api, triggerids, status, max_retries):
+    """
+    以数组形式提交一批 trigger.update。超时、连接失败等过载错误按指数退避加随机抖动重试；
+    JSON-RPC 错误（如参数错误、无权限）重试也不会成功，直接二分定位出错的触发器。
+    :return: (成功的触发器ID列表, [{"triggerid": ..., "error": ...}])
+    """
+    for attempt in range(max_retries):
+        try:
+            zabbix_api.trigger.update(*[{"triggerid": triggerid, "status": status} for triggerid in triggerids])
+            return list(triggerids), []
+        except Exception as e:
+            error = e
+            if attempt == max_retries - 1 or not is_overload_error(e):
+                break
+            delay = full_jitter_delay(attempt)
+            logging.warning(f"trigger.update 重试中 ({attempt+1}/{max_retries})，{delay:.1f} 秒后重试: {e}")
+            time.sleep(delay)
+
+    if len(triggerids) == 1:
+        logging.error(f"更新触发器 ID: {triggerids[0]} 状态为 {status} 时发生错误: {error}")
+        return [], [{"triggerid": triggerids[0], "error": str(error)}]
+
+    mid = len(triggerids) // 2
+    left_ok, left_failed = _update_chunk(zabbix_api, triggerids[:mid], status, max_retries)
+    right_ok, right_failed = _update_chunk(zabbix_api, triggerids[mid:], status, max_retries)
+    return left_ok + right_ok, left_failed + right_failed
+
+
+def bulk_update_trigger_status(zabbix_api, current_status, status, chunk_size=DEFAULT_UPDATE_CHUNK_SIZE, max_retries=3):
+    """
+    批量修改触发器启用状态：只提交当前状态与目标状态不同的触发器，按块以数组形式调用 trigger.update。
+    :param zabbix_api: Zabbix API 会话
+    :param current_status: {triggerid: 当前状态}
+    :param status: 目标状态（0: 启用, 1: 禁用）
+    :param chunk_size: 单次 trigger.update 的触发器数量
+    :param max_retries: 每块的最大重试次数
+    :return: {"updated": [已更新ID], "skipped": [状态已符合的ID], "failed": [{"triggerid": ..., "error": ...}]}
+    """
+    report = {"updated": [], "skipped": [], "failed": []}
+    pending = []
+    for triggerid, current in current_status.items():
+        if str(current) == str(status):
+            report["skipped"].append(triggerid)
+        else:
+            pending.append(triggerid)
+
+    for chunk in _chunks(pending, chunk_size):
+        updated, failed = _update_chunk(zabbix_api, chunk, status, max_retries)
+        report["updated"].extend(updated)
+        report["failed"].extend(failed)
+
+    logging.info(f"批量更新触发器状态为 {status}: 更新 {len(report['updated'])} 个，"
+                 f"跳过 {len(report['skipped'])} 个，失败 {len(report['failed'])} 个")
+    return report
@@ -1,19 +1,58 @@
-from update_trigger_api import update_triggers, login_zabbix_api
+from login_zabbix_api import login_zabbix_api
+from update_trigger_api import collect_trigger_info
+from trigger_bulk import STATUS_CODE_MAP, bulk_update_trigger_status
 import pandas as pd
 import logging
 
 # 设置日志记录格式
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def process_triggers_from_excel(file_path, trigger_name=None, monitor_key=None, monitor_item_value=None, trigger_status=None):
+def plan_trigger_changes(trigger_info, trigger_status):
     """
-    从 Excel 文件中读取主机名称，调用 update_triggers 函数处理触发器信息。
+    根据一次拉取的触发器信息生成变更计划，只包含当前状态与目标状态不同的触发器。
+
+    :param trigger_info: collect_trigger_info 返回的触发器信息列表
+    :param trigger_status: 目标触发器状态（0: 启用, 1: 禁用）
+    :return: 变更计划列表，每项包含触发器ID、主机、名称以及当前/目标状态
+    """
+    plan = []
+    for trigger in trigger_info:
+        current_status = STATUS_CODE_MAP.get(trigger.get("Trigger Enabled"))
+        if str(current_status) == str(trigger_status):
+            logging.info(f"触发器 {trigger['Trigger Name']} 状态已为目标状态，跳过更新")
+            continue
+        plan.append({
+            "Trigger ID": trigger["Trigger ID"],
+            "Host Name": trigger.get("Host Name"),
+            "Trigger Name": trigger.get("Trigger Name"),
+            "Current Status": current_status,
+            "Target Status": str(trigger_status)
+        })
+    return plan
+
+def apply_trigger_changes(zabbix_api, plan, trigger_status):
+    """
+    一次性提交变更计划（按块以数组形式调用 trigger.update）。
+
+    :param zabbix_api: Zabbix API 会话
+    :param plan: plan_trigger_changes 生成的变更计划
+    :param trigger_status: 目标触发器状态（0: 启用, 1: 禁用）
+    :return: bulk_update_trigger_status 的执行报告
+    """
+    current_status = {change["Trigger ID"]: change["Current Status"] for change in plan}
+    return bulk_update_trigger_status(zabbix_api, current_status, trigger_status)
+
+def process_triggers_from_excel(file_path, trigger_name=None, monitor_key=None, monitor_item_value=None, trigger_status=None, dry_run=False):
+    """
+    从 Excel 文件中读取主机名称，一次拉取所有触发器，生成变更计划并一次性执行。
 
     :param file_path: Excel 文件路径
     :param trigger_name: 触发器名称，用于筛选（可选）
     :param monitor_key: 监控项键名，用于筛选（可选）
     :param monitor_item_value: 监控项值，用于筛选（可选）
     :param trigger_status: 触发器状态（0: 启用, 1: 禁用）
+    :param dry_run: 仅输出将要变更的触发器ID，不执行更新
+    :return: 变更计划（dry_run 时）、执行报告，未指定 trigger_status 时返回触发器信息
     """
     try:
         # 加载 Excel 文件
@@ -28,39 +67,34 @@ def process_triggers_from_excel(file_path, trigger_name=None, monitor_key=None,
         # 初始化 Zabbix API 会话
         zabbix_api = login_zabbix_api()
 
-        # 遍历主机名并处理触发器
-        for host_name in host_names:
-            logging.info(f"开始处理主机: {host_name}")
-            triggers = update_triggers(
-                zabbix_api=zabbix_api,
-                host_name=host_name,
-                trigger_name=trigger_name,
-                monitor_key=monitor_key,
-                monitor_item_value=monitor_item_value,
-                get_triggers_only=True  # 获取触发器信息而不执行更新
-            )
-
-            if not triggers:
-                logging.info(f"主机 {host_name} 未找到符合条件的触发器")
-                continue
-
-            for trigger in triggers:
-                current_status = trigger.get("Trigger Enabled")
-                if str(current_status) == str(trigger_status):
-                    logging.info(f"触发器 {trigger['Trigger Name']} 状态已为目标状态，跳过更新")
-                    continue
-
-                logging.info(f"更新触发器 {trigger['Trigger Name']} 状态为 {trigger_status}")
-                update_triggers(
-                    zabbix_api=zabbix_api,
-                    host_name=host_name,
-                    trigger_name=trigger_name,
-                    monitor_key=monitor_key,
-                    monitor_item_value=monitor_item_value,
-                    trigger_status=trigger_status
-                )
+        # 一次拉取所有主机的触发器并生成变更计划
+        trigger_info = collect_trigger_info(
+            zabbix_api,
+            host_names,
+            trigger_name=trigger_name,
+            monitor_key=monitor_key,
+            monitor_item_value=monitor_item_value
+        )
+        if not trigger_info:
+            logging.info("未找到符合条件的触发器")
+            return []
+
+        if trigger_status is None:
+            logging.info("未指定目标状态，仅返回触发器信息")
+            return trigger_info
+
+        plan = plan_trigger_changes(trigger_info, trigger_status)
+        for change in plan:
+            logging.info(f"{'[DRY-RUN] 将' if dry_run else ''}更新触发器 {change['Trigger ID']} "
+                         f"({change['Host Name']} / {change['Trigger Name']}) 状态 {change['Current Status']} -> {change['Target Status']}")
+        logging.info(f"共 {len(plan)} 个触发器需要变更，触发器ID: {[change['Trigger ID'] for change in plan]}")
+
+        if dry_run or not plan:
+            return plan
 
+        report = apply_trigger_changes(zabbix_api, plan, trigger_status)
         logging.info("所有主机处理完成！")
+        return report
 
     except FileNotFoundError:
         logging.error(f"指定的 Excel 文件 {file_path} 不存在")
@@ -74,6 +108,7 @@ if __name__ == "__main__":
     # MONITOR_KEY = 'proc.num[,,,"/usr/sbin/ntpd"]'  # 默认监控项键
     MONITOR_ITEM_VALUE = None  # 筛选监控项值（如需关闭筛选，则设置为 None）
     TRIGGER_STATUS = 1  # 触发器状态（0: 启用, 1: 禁用）
+    DRY_RUN = False  # 设置为 True 时仅输出将要变更的触发器ID，不执行更新
 
     # 调用函数处理触发器
     process_triggers_from_excel(
@@ -81,5 +116,6 @@ if __name__ == "__main__":
         trigger_name=TRIGGER_NAME,
         # monitor_key=MONITOR_KEY,
         monitor_item_value=MONITOR_ITEM_VALUE,
-        trigger_status=TRIGGER_STATUS
+        trigger_status=TRIGGER_STATUS,
+        dry_run=DRY_RUN
     )
@@ -2,14 +2,13 @@ import logging
 import pandas as pd
 import json
 import argparse
-from login_zabbix_api import login_zabbix_api
+from login_zabbix_api import login_zabbix_pool
+from trigger_bulk import (DEFAULT_MAX_WORKERS, DEFAULT_HOST_CHUNK_SIZE, build_trigger_row,
+                          resolve_hosts_by_name, fetch_triggers_for_hosts)
 
 # 设置日志记录格式
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-STATUS_MAP = {"0": "正常", "1": "问题"}
-VALUE_MAP = {"0": "启用", "1": "禁用"}
-
 def get_host_id_by_name(zabbix_api, host_name):
     try:
         host_info = zabbix_api.host.get(filter={"host": host_name}, output=["hostid", "name", "host"])
@@ -37,6 +36,32 @@ def get_monitor_item_value(zabbix_api, host_id, key):
         logging.error(f"查询监控项 {key} 的值时发生错误: {e}")
         return None
 
+def get_monitor_item_values(zabbix_api, host_ids, key, chunk_size=DEFAULT_HOST_CHUNK_SIZE):
+    """
+    批量查询多台主机同一监控项的最新值，按 hostid 建立索引。
+
+    :param zabbix_api: Zabbix API 会话
+    :param host_ids: 主机ID列表
+    :param key: 监控项键名（模糊匹配）
+    :param chunk_size: 单次 item.get 的主机数量
+    :return: {hostid: lastvalue}，每台主机取第一个匹配的监控项
+    """
+    values = {}
+    host_ids = list(host_ids)
+    try:
+        for i in range(0, len(host_ids), chunk_size):
+            items = zabbix_api.item.get(
+                hostids=host_ids[i:i + chunk_size],
+                search={"key_": key},
+                output=["itemid", "hostid", "lastvalue"]
+            )
+            for item in items:
+                values.setdefault(item["hostid"], item.get("lastvalue"))
+        logging.debug(f"监控项 {key} 的批量查询结果: {values}")
+    except Exception as e:
+        logging.error(f"批量查询监控项 {key} 的值时发生错误: {e}")
+    return values
+
 def get_trigger_info(zabbix_api, host_id, host_name, host_ip, trigger_name=None, monitor_key=None, monitor_item_value=None):
     try:
         search_params = {"description": trigger_name} if trigger_name else {}
@@ -47,42 +72,61 @@ def get_trigger_info(zabbix_api, host_id, host_name, host_ip, trigger_name=None,
         )
         logging.debug(f"从 Zabbix API 获取到的触发器信息: {triggers}")
 
+        # 如果指定了监控项的键和值，则进行筛选（监控项与触发器无关，每台主机只查询一次）
+        if triggers and monitor_key and monitor_item_value is not None:
+            item_value = get_monitor_item_value(zabbix_api, host_id, monitor_key)
+            if item_value is None or str(item_value) != str(monitor_item_value):
+                return []
+
         trigger_info_list = []
         for trigger in triggers:
-            # 如果指定了监控项的键和值，则进行筛选
-            if monitor_key and monitor_item_value is not None:
-                item_value = get_monitor_item_value(zabbix_api, host_id, monitor_key)
-                if item_value is None or str(item_value) != str(monitor_item_value):
-                    continue
-
-            tags = trigger.get("tags", [])
-            tag_info = {
-                "Host Name": host_name,
-                "Host IP": host_ip,
-                "Trigger ID": trigger.get("triggerid", "未知Trigger ID"),
-                "Trigger Name": trigger.get("description", "未知Trigger Name"),
-                "Trigger Status": STATUS_MAP.get(trigger.get("value"), "未知"),
-                "Trigger Enabled": VALUE_MAP.get(trigger.get("status"), "未知"),
-            }
-            for tag in tags:
-                tag_name = tag.get('tag')
-                tag_value = tag.get('value')
-                if tag_name in tag_info:
-                    existing_value = tag_info[tag_name]
-                    if isinstance(existing_value, list):
-                        tag_info[tag_name].append(tag_value)
-                    else:
-                        tag_info[tag_name] = [existing_value, tag_value]
-                else:
-                    tag_info[tag_name] = tag_value
-
+            tag_info = build_trigger_row(trigger, host_name, host_ip)
             trigger_info_list.append(tag_info)
         return trigger_info_list
     except Exception as e:
         logging.error(f"从 Zabbix API 获取触发器信息时发生错误: {e}")
         return []
 
-def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None, monitor_key=None, monitor_item_value=None):
+def collect_trigger_info(zabbix_api, host_names, trigger_name=None, monitor_key=None, monitor_item_value=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    批量获取多台主机的触发器信息：一次 host.get 解析所有主机名，再按主机分块并发拉取触发器。
+
+    :param zabbix_api: Zabbix API 会话
+    :param host_names: 主机名列表
+    :param trigger_name: 触发器名称（可选）
+    :param monitor_key: 监控项键名（可选）
+    :param monitor_item_value: 监控项值（可选）
+    :param max_workers: 拉取触发器的并发数
+    :return: 触发器信息列表
+    """
+    hosts, missing = resolve_hosts_by_name(zabbix_api, list(host_names))
+    for host_name in missing:
+        logging.warning(f"主机名 {host_name} 的主机未找到")
+
+    triggers_by_host = fetch_triggers_for_hosts(zabbix_api, list(hosts), trigger_name, max_workers=max_workers)
+
+    # 如果指定了监控项的键和值，一次查询所有有触发器的主机的监控项最新值
+    item_values = None
+    if monitor_key and monitor_item_value is not None:
+        item_values = get_monitor_item_values(zabbix_api, [hostid for hostid, triggers in triggers_by_host.items() if triggers], monitor_key)
+
+    all_trigger_info = []
+    for hostid, host in hosts.items():
+        triggers = triggers_by_host.get(hostid, [])
+        if not triggers:
+            continue
+        if item_values is not None:
+            item_value = item_values.get(hostid)
+            if item_value is None or str(item_value) != str(monitor_item_value):
+                continue
+        for trigger in triggers:
+            all_trigger_info.append(build_trigger_row(trigger, host.get("name", "未知Host Name"), host.get("host", "未知Host IP")))
+    return all_trigger_info
+
+def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None, monitor_key=None, monitor_item_value=None, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    批量处理 Excel 中的主机：一次 host.get 解析所有主机名，再按主机分块并发拉取触发器。
+    """
     try:
         df = pd.read_excel(file_path)
         if 'Host Name' not in df.columns:
@@ -90,15 +134,7 @@ def process_hosts_from_excel(file_path, zabbix_api, trigger_name=None, monitor_k
             return []
 
         host_names = df['Host Name'].dropna().unique()
-        all_trigger_info = []
-
-        for host_name in host_names:
-            host_id, host_name_resolved, host_ip = get_host_id_by_name(zabbix_api, host_name)
-            if host_id:
-                trigger_info = get_trigger_info(zabbix_api, host_id, host_name_resolved, host_ip, trigger_name, monitor_key, monitor_item_value)
-                all_trigger_info.extend(trigger_info)
-
-        return all_trigger_info
+        return collect_trigger_info(zabbix_api, host_names, trigger_name, monitor_key, monitor_item_value, max_workers)
     except Exception as e:
         logging.error(f"处理 Excel 文件时发生错误: {e}")
         return []
@@ -178,6 +214,6 @@ if __name__ == "__main__":
     parser.add_argument('--trigger-status', type=int, choices=[0, 1], help='设置触发器状态 (0: 启用, 1: 禁用)')
 
     args = parser.parse_args()
-    zabbix_api = login_zabbix_api()
+    zabbix_api = login_zabbix_pool()
 
     update_triggers(zabbix_api, args.host_name, args.file_path, args.trigger_name, args.monitor_key, args.monitor_item_value, args.trigger_status)